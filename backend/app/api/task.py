@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select, func, col
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from backend.app.core.db import get_session, engine
 from backend.app.models.task import DataTask
 from backend.app.models.audit import AuditLog
+from backend.app.models.sync_state import SyncState
 from backend.app.services.spark_service import submit_spark_job
-from backend.app.services.sync_service import run_sync_task
+from backend.app.services.task_queue import enqueue_task, lease_lost
 import logging
 import re
 
@@ -20,6 +21,10 @@ def _redact_secrets(text: str | None) -> str | None:
     redacted = re.sub(r"((?:password|passwd|pwd)\s*[:=]\s*)([^,\s'\"\\]+)", r"\1****", redacted, flags=re.IGNORECASE)
     return redacted
 
+def _delete_sync_state(session: Session, task_id: int):
+    for state in session.exec(select(SyncState).where(SyncState.task_id == task_id)).all():
+        session.delete(state)
+
 @router.post("/", response_model=DataTask)
 def create_task(task: DataTask, session: Session = Depends(get_session)):
     session.add(task)
@@ -44,6 +49,7 @@ def delete_tasks(ids: List[int], session: Session = Depends(get_session)):
     deleted_names = []
     for task in tasks:
         deleted_names.append(task.name)
+        _delete_sync_state(session, task.id)
         session.delete(task)
     
     # Audit Log
@@ -60,6 +66,7 @@ def delete_task(task_id: int, session: Session = Depends(get_session)):
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    _delete_sync_state(session, task.id)
     session.delete(task)
     
     # Audit Log
@@ -91,6 +98,29 @@ def read_task(task_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Task not found")
     return task
 
+@router.get("/{task_id}/tables", response_model=Dict[str, Any])
+def read_task_tables(task_id: int, session: Session = Depends(get_session)):
+    """Per-table status of a multi-table sync task."""
+    task = session.get(DataTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    states = session.exec(
+        select(SyncState).where(SyncState.task_id == task_id, SyncState.status != None).order_by(SyncState.table_name)
+    ).all()
+    items = [
+        {
+            "table_name": s.table_name,
+            "status": s.status,
+            "progress": s.progress,
+            "rows": s.rows,
+            "verification_status": s.verification_status,
+            "message": _redact_secrets(s.message),
+            "updated_at": s.updated_at,
+        }
+        for s in states
+    ]
+    return {"items": items, "total": len(items), "progress": task.progress}
+
 def run_spark_job_background(task_id: int):
     with Session(engine) as session:
         task = session.get(DataTask, task_id)
@@ -121,20 +151,26 @@ def run_spark_job_background(task_id: int):
             log = AuditLog(user_id="system", action="task_failed", resource=task.name, details=_redact_secrets(str(e)))
             session.add(log)
         
+        if lease_lost(task_id, session):
+            # Requeued after missed heartbeats; the worker that owns it now reports the status
+            logger.warning(f"Task {task_id} was taken over by another worker, not recording this run")
+            return
         session.add(task)
         session.commit()
 
 @router.post("/{task_id}/run")
-def run_task(task_id: int, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+def run_task(task_id: int, priority: Optional[int] = None, session: Session = Depends(get_session)):
     task = session.get(DataTask, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    # Running tasks without a worker were orphaned by an older server and may be rerun
+    if task.status == "queued" or (task.status == "running" and task.worker_id):
+        raise HTTPException(status_code=409, detail=f"Task is already {task.status}")
     
-    task.status = "running"
-    task.progress = 0
-    from datetime import datetime
-    task.updated_at = datetime.utcnow() # Update timestamp on run
-    session.add(task)
+    # Worker processes pick the task up from the queue (backend/app/worker.py)
+    if priority is not None:
+        task.priority = priority
+    enqueue_task(session, task)
     
     # Audit Log for start
     log = AuditLog(user_id="admin", action="run_task", resource=task.name)
@@ -142,9 +178,4 @@ def run_task(task_id: int, background_tasks: BackgroundTasks, session: Session =
     
     session.commit()
     
-    if task.task_type == "sync":
-        background_tasks.add_task(run_sync_task, task_id)
-    else:
-        background_tasks.add_task(run_spark_job_background, task_id)
-    
-    return {"message": "Task started", "task_id": task_id}
+    return {"message": "Task queued", "task_id": task_id}
@@ -23,6 +23,7 @@ class Settings(BaseSettings):
     # ClickHouse Configuration
     CK_HOST: str = "localhost"
     CK_PORT: int = 9000
+    CK_HTTP_PORT: int = 8123  # HTTP interface, used by the Arrow transport
     CK_USER: str = "default"
     CK_PASSWORD: str = ""
 
@@ -30,7 +31,53 @@ class Settings(BaseSettings):
     MINIO_ENDPOINT: str = "localhost:9000"
     MINIO_ROOT_USER: str = "minioadmin"
     MINIO_ROOT_PASSWORD: str = "minioadmin"
-    
+
+    # Spark Job Daemon
+    # Preprocess jobs run in a long-lived process with a warm SparkSession, started on first use.
+    # When it cannot be reached, jobs fall back to a subprocess per job.
+    SPARK_DAEMON: bool = True
+    SPARK_DAEMON_HOST: str = "127.0.0.1"
+    SPARK_DAEMON_PORT: int = 7078
+    # Shared secret for the daemon socket. When empty, a random key is generated on first
+    # start and kept in SPARK_DAEMON_AUTHKEY_FILE (mode 0600); without either the daemon is off.
+    SPARK_DAEMON_AUTHKEY: str = ""
+    SPARK_DAEMON_AUTHKEY_FILE: str = "temp_configs/spark_daemon.key"
+    SPARK_DAEMON_MAX_JOBS: int = 2
+    SPARK_DAEMON_START_TIMEOUT: float = 30.0
+    # Lines of job output kept per task (the most recent ones), for logs and failure details
+    JOB_LOG_MAX_LINES: int = 2000
+
+    # Sync Configuration
+    # Upper bound for worker threads a single sync task may use (source.parallelism is capped by this)
+    SYNC_MAX_WORKERS: int = 8
+
+    # Task Workers
+    # Worker processes claiming queued tasks; the API starts them itself when WORKER_EMBEDDED,
+    # otherwise run `python -m backend.app.worker` separately
+    WORKER_PROCESSES: int = 2
+    WORKER_EMBEDDED: bool = True
+    WORKER_POLL_SECONDS: float = 2.0
+    WORKER_HEARTBEAT_SECONDS: float = 10.0
+    # A running task whose heartbeat is older than this is requeued (up to WORKER_MAX_ATTEMPTS runs)
+    WORKER_STALE_SECONDS: float = 60.0
+    WORKER_MAX_ATTEMPTS: int = 3
+    # Concurrent tasks per DataSource, unless its connection_info sets max_tasks
+    WORKER_TASKS_PER_SOURCE: int = 2
+
+    # Task Scheduling (see services/task_queue.py)
+    # Share of workers each task class gets when both have queued tasks
+    SCHEDULER_WEIGHTS: dict = {"sync": 1, "preprocess": 3}
+    # Queued tasks gain one priority level per this many seconds of waiting
+    SCHEDULER_AGING_SECONDS: float = 600.0
+    # Tasks estimated at or below this many rows are interactive and always admitted
+    SCHEDULER_SMALL_TASK_ROWS: int = 100000
+    # Estimate for sync tasks that have never run; preprocess tasks default to interactive
+    SCHEDULER_DEFAULT_SYNC_ROWS: int = 1000000
+    # Bulk tasks start only while the running estimate stays under this many rows
+    SCHEDULER_MAX_RUNNING_ROWS: int = 50000000
+    # Concurrent bulk tasks; 0 keeps one worker free for interactive tasks (WORKER_PROCESSES - 1)
+    SCHEDULER_MAX_BULK_TASKS: int = 0
+
     # CK_DB is not in env, defaulting to 'default' or handled dynamically?
     # User env has CK_host, CK_port, CK_user, CK_password.
     # Note: env file has lowercase keys CK_host, etc. Pydantic reads case-insensitive if configured, 
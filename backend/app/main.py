@@ -1,13 +1,21 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from backend.app.core.config import settings
 from backend.app.core.db import create_db_and_tables
 from backend.app.api import datasource, task, audit, data_management
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    workers = None
+    if settings.WORKER_EMBEDDED and settings.WORKER_PROCESSES > 0:
+        from backend.app.worker import start_workers
+        workers = start_workers(settings.WORKER_PROCESSES)
     yield
+    if workers:
+        from backend.app.worker import stop_workers
+        stop_workers(*workers)
 
 app = FastAPI(lifespan=lifespan, title="Data Preprocessing System API")
 
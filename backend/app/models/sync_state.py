@@ -0,0 +1,17 @@
+from typing import Optional
+from sqlmodel import Field, SQLModel
+from datetime import datetime
+
+class SyncState(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_id: int = Field(index=True)
+    table_name: str  # Source table the state belongs to
+    watermark: Optional[str] = None  # JSON-encoded last synced watermark value (incremental mode)
+    checkpoint: Optional[str] = None  # JSON-encoded resume point of an interrupted full copy
+    # Per-table status of multi-table sync tasks
+    status: Optional[str] = None  # pending, running, success, failed
+    progress: int = 0
+    rows: int = 0
+    verification_status: Optional[str] = None
+    message: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
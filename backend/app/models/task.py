@@ -7,9 +7,18 @@ class DataTask(SQLModel, table=True):
     name: str
     task_type: str  # full_sync, preprocess
     config: str  # JSON string containing source, target, operators
-    status: str = Field(default="pending")  # pending, running, success, failed
+    status: str = Field(default="pending")  # pending, queued, running, success, failed
     verification_status: Optional[str] = Field(default=None) # verified, failed, None
     progress: int = Field(default=0)
     spark_app_id: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: Optional[datetime] = Field(default=None) # Initially None until run
+    # Worker queue bookkeeping (see services/task_queue.py)
+    queued_at: Optional[datetime] = Field(default=None)
+    worker_id: Optional[str] = Field(default=None)
+    heartbeat_at: Optional[datetime] = Field(default=None)
+    attempts: int = Field(default=0)
+    # Scheduling: higher priority runs first; estimated_rows (set from the last run, or by
+    # the creator) drives admission control
+    priority: int = Field(default=0)
+    estimated_rows: Optional[int] = Field(default=None)
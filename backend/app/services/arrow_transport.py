@@ -0,0 +1,94 @@
+import io
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+# Columnar (Apache Arrow) transport for ClickHouse sync tasks and pandas jobs.
+# ClickHouse is read and written through its HTTP interface in ArrowStream format, so
+# values never become Python objects. MySQL sources are not offered Arrow: pymysql
+# returns tuples and the writers bind Python values, so columns would only add conversions.
+
+def _require_arrow():
+    if not ARROW_AVAILABLE:
+        raise RuntimeError("Arrow transport requires pyarrow (pip install pyarrow)")
+
+def batch_to_frame(batch) -> pd.DataFrame:
+    """Zero-copy Arrow-backed DataFrame view of a RecordBatch or Table."""
+    return batch.to_pandas(types_mapper=pd.ArrowDtype)
+
+def clickhouse_http_url(conn: dict, default_port: int = 8123) -> str:
+    scheme = "https" if conn.get("secure") else "http"
+    return f"{scheme}://{conn['host']}:{conn.get('http_port', default_port)}/"
+
+def _http_params(conn: dict, query: str) -> dict:
+    return {
+        "query": query,
+        "database": conn.get("database", "default"),
+        # Strings as Arrow utf8 instead of binary, so pandas sees text columns
+        "output_format_arrow_string_as_string": 1,
+    }
+
+def _select_arrow(conn: dict, query: str, timeout: int):
+    _require_arrow()
+    import requests
+
+    resp = requests.post(
+        clickhouse_http_url(conn),
+        params=_http_params(conn, f"{query} FORMAT ArrowStream"),
+        auth=(conn.get("user", "default"), conn.get("password", "")),
+        stream=True,
+        timeout=timeout,
+    )
+    if resp.status_code != 200:
+        resp.close()
+        raise Exception(f"ClickHouse HTTP error {resp.status_code}: {resp.text[:500]}")
+    resp.raw.decode_content = True
+    return resp
+
+def iter_clickhouse_arrow(conn: dict, query: str, timeout: int = 3600):
+    """
+    Stream a ClickHouse SELECT as Arrow RecordBatches (FORMAT ArrowStream over HTTP).
+    conn holds host, http_port (default 8123), user, password, database and secure.
+    Bind parameters before calling, e.g. with clickhouse_driver's Client.substitute_params.
+    """
+    resp = _select_arrow(conn, query, timeout)
+    try:
+        with pa.ipc.open_stream(resp.raw) as reader:
+            for batch in reader:
+                if batch.num_rows:
+                    yield batch
+    finally:
+        resp.close()
+
+def read_clickhouse_arrow(conn: dict, query: str, timeout: int = 3600) -> pd.DataFrame:
+    """Whole ClickHouse result as an Arrow-backed DataFrame."""
+    resp = _select_arrow(conn, query, timeout)
+    try:
+        with pa.ipc.open_stream(resp.raw) as reader:
+            return batch_to_frame(reader.read_all())
+    finally:
+        resp.close()
+
+def insert_clickhouse_arrow(conn: dict, table: str, data, timeout: int = 3600):
+    """INSERT a RecordBatch, Table or DataFrame into ClickHouse as one ArrowStream body."""
+    _require_arrow()
+    import requests
+
+    if isinstance(data, pd.DataFrame):
+        data = pa.Table.from_pandas(data, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, data.schema) as writer:
+        writer.write(data)
+    resp = requests.post(
+        clickhouse_http_url(conn),
+        params=_http_params(conn, f"INSERT INTO {table} FORMAT ArrowStream"),
+        auth=(conn.get("user", "default"), conn.get("password", "")),
+        data=sink.getvalue(),
+        timeout=timeout,
+    )
+    if resp.status_code != 200:
+        raise Exception(f"ClickHouse HTTP error {resp.status_code}: {resp.text[:500]}")
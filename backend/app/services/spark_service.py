@@ -1,12 +1,161 @@
 import subprocess
 import json
 import os
+import secrets
 import sys
+import time
+from multiprocessing.connection import Client
 from sqlmodel import Session
 from backend.app.models.task import DataTask
 from backend.app.models.datasource import DataSource
 from backend.app.core.db import engine
 from backend.app.core.config import settings
+from backend.spark_jobs.progress import BoundedLog, parse_progress
+
+def _job_env():
+    # We set PYTHONPATH to include current directory so backend modules can be imported
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    # Line-by-line output, so progress arrives while the job runs
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+def _daemon_authkey():
+    """
+    Authkey for the daemon socket: SPARK_DAEMON_AUTHKEY, otherwise a random key created on
+    first use in SPARK_DAEMON_AUTHKEY_FILE, readable by the owner only. The daemon unpickles
+    what it receives, so None (no usable key) disables it.
+    """
+    if settings.SPARK_DAEMON_AUTHKEY:
+        return settings.SPARK_DAEMON_AUTHKEY.encode()
+    path = settings.SPARK_DAEMON_AUTHKEY_FILE
+    if not path:
+        return None
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            if os.stat(path).st_mode & 0o077:
+                print(f"Spark daemon key file {path} is readable by other users, not using it")
+                return None
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+        with open(path) as f:
+            key = f.read().strip()
+    except OSError as e:
+        print(f"Could not read or create Spark daemon key file {path}: {e}")
+        return None
+    return key.encode() or None
+
+def _start_daemon():
+    script_path = os.path.abspath("backend/spark_jobs/job_daemon.py")
+    cmd = [
+        sys.executable, script_path,
+        "--host", settings.SPARK_DAEMON_HOST,
+        "--port", str(settings.SPARK_DAEMON_PORT),
+        "--max-jobs", str(settings.SPARK_DAEMON_MAX_JOBS),
+        "--log-lines", str(settings.JOB_LOG_MAX_LINES),
+    ]
+    env = _job_env()
+    env["SPARK_DAEMON_AUTHKEY"] = _daemon_authkey().decode()
+    os.makedirs("temp_configs", exist_ok=True)
+    print(f"Starting Spark job daemon: {' '.join(cmd)}")
+    with open(os.path.join("temp_configs", "spark_daemon.log"), "ab") as log:
+        # Own session, so the daemon outlives the worker that started it.
+        # If another worker starts one at the same time, the loser fails to bind and exits.
+        subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+
+def _connect_daemon():
+    """Connection to the Spark job daemon, starting it if nothing listens yet. None if unreachable."""
+    authkey = _daemon_authkey()
+    if authkey is None:
+        return None
+    address = (settings.SPARK_DAEMON_HOST, settings.SPARK_DAEMON_PORT)
+    deadline = None
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except ConnectionRefusedError:
+            pass
+        except Exception as e:
+            print(f"Could not connect to Spark job daemon: {e}")
+            return None
+        if deadline is None:
+            _start_daemon()
+            deadline = time.monotonic() + settings.SPARK_DAEMON_START_TIMEOUT
+        elif time.monotonic() > deadline:
+            return None
+        time.sleep(0.5)
+
+def _run_in_daemon(job_config: dict, group: str, on_progress=None):
+    """
+    Run a job config in the Spark job daemon. Returns (success, output), or None if it is
+    unreachable. Progress messages the daemon relays while the job runs go to on_progress.
+    """
+    conn = _connect_daemon()
+    if conn is None:
+        print("Spark job daemon unavailable, running the job in a subprocess")
+        return None
+    print(f"Submitting {group} to the Spark job daemon")
+    try:
+        with conn:
+            conn.send({"op": "run", "config": job_config, "group": group})
+            while True:
+                reply = conn.recv()
+                if "progress" not in reply:
+                    break
+                if on_progress:
+                    on_progress(reply["progress"])
+    except (EOFError, OSError) as e:
+        # The job may have partly run, so it is reported failed rather than run again here
+        return False, f"Lost connection to Spark job daemon: {e}"
+    print("OUTPUT:", reply["output"])
+    return reply["ok"], reply["output"]
+
+def _run_subprocess(cmd, env, on_progress=None):
+    """
+    Run a job process, reading its merged stdout/stderr line by line as it is written.
+    PROGRESS lines go to on_progress, the rest to a BoundedLog. Returns (success, output).
+    """
+    log = BoundedLog(settings.JOB_LOG_MAX_LINES)
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+    with proc.stdout:
+        # readline(limit) splits runaway lines instead of buffering them whole
+        for line in iter(lambda: proc.stdout.readline(64 * 1024), ""):
+            line = line.rstrip("\n")
+            progress = parse_progress(line)
+            if progress is not None:
+                if on_progress:
+                    on_progress(progress)
+                continue
+            print(f"[job] {line}")
+            log.append(line)
+    returncode = proc.wait()
+    if returncode != 0:
+        print(f"Error executing Spark job (exit code {returncode})")
+    return returncode == 0, log.text()
+
+def _progress_updater(task_id: int):
+    """on_progress callback that stores a job's reported percentage in DataTask.progress."""
+    last = None
+
+    def update(progress: dict):
+        nonlocal last
+        percent = progress.get("percent")
+        if percent is None or percent == last:
+            return
+        last = percent
+        with Session(engine) as session:
+            task = session.get(DataTask, task_id)
+            if task:
+                # 100 is set by the caller once the job has exited successfully
+                task.progress = min(max(int(percent), 0), 99)
+                session.add(task)
+                session.commit()
+
+    return update
 
 def submit_spark_job(task: DataTask):
     # 1. Prepare Config File
@@ -15,12 +164,14 @@ def submit_spark_job(task: DataTask):
     config_path = os.path.abspath(f"{config_dir}/task_{task.id}.json")
     
     # Inject System Settings into Job Config
+    job_config = None
     try:
         job_config = json.loads(task.config)
         job_config['system_db_url'] = settings.SYSTEM_DB_URL
         job_config['clickhouse'] = {
             'host': settings.CK_HOST,
             'port': settings.CK_PORT,
+            'http_port': settings.CK_HTTP_PORT,
             'user': settings.CK_USER,
             'password': settings.CK_PASSWORD
         }
@@ -45,15 +196,24 @@ def submit_spark_job(task: DataTask):
             json.dump(job_config, f, indent=2)
     except Exception as e:
         print(f"Error parsing task config: {e}")
+        job_config = None
         # Fallback to raw config if parse fails (shouldn't happen)
         with open(config_path, 'w') as f:
             f.write(task.config)
     
-    # 2. Determine Script Path
+    # 2. Run in the warm job daemon (its own Spark job group per task) when available
+    on_progress = _progress_updater(task.id)
+    if settings.SPARK_DAEMON and job_config is not None:
+        result = _run_in_daemon(job_config, f"task-{task.id}", on_progress)
+        if result is not None:
+            return result
+    
+    # 3. Otherwise a fresh process per job
+    # Determine Script Path
     # Assuming we run from project root
     script_path = os.path.abspath("backend/spark_jobs/preprocess_job.py")
     
-    # 3. Construct Command
+    # Construct Command
     # We use sys.executable to ensure we use the same python environment
     # In production this would be 'spark-submit'
     cmd = [
@@ -62,31 +222,8 @@ def submit_spark_job(task: DataTask):
         "--config", config_path
     ]
     
-    # 4. Run Command
-    # We set PYTHONPATH to include current directory so backend modules can be imported
-    env = os.environ.copy()
-    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    # Run Command
+    env = _job_env()
     
     print(f"Executing: {' '.join(cmd)}")
-    
-    try:
-        result = subprocess.run(
-            cmd, 
-            capture_output=True, 
-            text=True, 
-            env=env,
-            check=True
-        )
-        print("STDOUT:", result.stdout)
-        print("STDERR:", result.stderr)
-        return True, result.stdout
-    except subprocess.CalledProcessError as e:
-        print("Error executing Spark job")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        combined = ""
-        if e.stderr:
-            combined += e.stderr
-        if e.stdout:
-            combined += ("\n" if combined else "") + e.stdout
-        return False, combined
+    return _run_subprocess(cmd, env, on_progress)
@@ -0,0 +1,165 @@
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Source-side flow control for sync tasks: batch sizes adapted to the table's row width
+# and read latency, and per-DataSource rows/s and bytes/s ceilings.
+
+class ChunkSizer:
+    """
+    Picks the next batch size from observed bytes per row and batch latency.
+    A batch aims at `target_bytes` of data and `target_seconds` of read time, whichever
+    is smaller, and grows by at most 2x per batch. Thread-safe, so parallel readers of
+    one table can share it.
+    """
+
+    def __init__(self, initial: int = 5000, min_rows: int = 500, max_rows: int = 200000,
+                 target_bytes: int = 8 * 1024 * 1024, target_seconds: float = 1.0):
+        self.min_rows = max(int(min_rows), 1)
+        self.max_rows = max(int(max_rows), self.min_rows)
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self._size = min(max(int(initial), self.min_rows), self.max_rows)
+        self._bytes_per_row = None
+        self._rows_per_sec = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def observe(self, rows: int, nbytes: int, seconds: float):
+        if rows <= 0:
+            return
+        with self._lock:
+            # Exponential moving averages smooth out single slow or odd-sized batches
+            bpr = nbytes / rows
+            self._bytes_per_row = bpr if self._bytes_per_row is None else 0.7 * self._bytes_per_row + 0.3 * bpr
+            if seconds > 0:
+                rps = rows / seconds
+                self._rows_per_sec = rps if self._rows_per_sec is None else 0.7 * self._rows_per_sec + 0.3 * rps
+
+            wanted = self.target_bytes / max(self._bytes_per_row, 1.0)
+            if self._rows_per_sec:
+                wanted = min(wanted, self._rows_per_sec * self.target_seconds)
+            wanted = min(wanted, self._size * 2)
+            self._size = int(min(max(wanted, self.min_rows), self.max_rows))
+
+
+def _parse_hours(hours: str):
+    start, end = (part.strip() for part in hours.split("-", 1))
+    return (datetime.strptime(start, "%H:%M").time(), datetime.strptime(end, "%H:%M").time())
+
+def _in_window(window, now) -> bool:
+    start, end = window
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end  # window wraps past midnight
+
+
+class Throttle:
+    """
+    Token-bucket limiter for a source's rows/s and bytes/s ceilings, shared by every
+    reader of that source. `rules` are checked in order and the first whose `hours`
+    window ("HH:MM-HH:MM", local time) contains the current time applies; a rule without
+    `hours` always applies. When no rule applies, reads are not limited.
+    """
+
+    def __init__(self, rules, clock=time.monotonic, sleep=time.sleep, now=datetime.now):
+        self._clock = clock
+        self._sleep = sleep
+        self._now = now
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._last = None
+        self.configure(rules)
+
+    def configure(self, rules):
+        parsed = []
+        for rule in rules:
+            window = _parse_hours(rule["hours"]) if rule.get("hours") else None
+            limits = {k: float(rule[k]) for k in ("rows_per_sec", "bytes_per_sec") if rule.get(k)}
+            parsed.append((window, limits))
+        with self._lock:
+            self._rules = parsed
+            self._raw = rules
+
+    def limits(self) -> dict:
+        now = self._now().time()
+        for window, limits in self._rules:
+            if window is None or _in_window(window, now):
+                return limits
+        return {}
+
+    def acquire(self, rows: int, nbytes: int = 0):
+        """Account for a batch that was just read, sleeping long enough to respect the ceilings."""
+        wait = 0.0
+        with self._lock:
+            limits = self.limits()
+            now = self._clock()
+            elapsed = now - self._last if self._last is not None else 0.0
+            self._last = now
+            for name, amount in (("rows_per_sec", rows), ("bytes_per_sec", nbytes)):
+                rate = limits.get(name)
+                if not rate:
+                    self._tokens.pop(name, None)
+                    continue
+                # Burst capacity of one second; a batch larger than that runs the bucket into debt
+                tokens = min(self._tokens.get(name, rate) + elapsed * rate, rate) - amount
+                self._tokens[name] = tokens
+                if tokens < 0:
+                    wait = max(wait, -tokens / rate)
+        if wait > 0:
+            self._sleep(wait)
+
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def get_throttle(source_id: int, conn_info: dict):
+    """
+    Shared Throttle for a DataSource, built from connection_info["throttle"]: one rule
+    {"rows_per_sec", "bytes_per_sec", "hours"} or a list of them. Returns None when the
+    source has no throttle configured. Concurrent tasks reading the same source share
+    the same token buckets.
+    """
+    rules = conn_info.get("throttle")
+    if not rules:
+        return None
+    if isinstance(rules, dict):
+        rules = [rules]
+    with _throttles_lock:
+        throttle = _throttles.get(source_id)
+        if throttle is None:
+            throttle = _throttles[source_id] = Throttle(rules)
+        elif throttle._raw != rules:
+            throttle.configure(rules)
+        return throttle
+
+_slots = {}
+
+def source_slots(source_id: int, conn_info: dict, default: int):
+    """
+    Semaphore bounding how many tables of a DataSource are read at once, across all
+    tasks in this process. The limit is connection_info["max_concurrency"] or `default`.
+    """
+    limit = max(int(conn_info.get("max_concurrency") or default), 1)
+    with _throttles_lock:
+        slots = _slots.get(source_id)
+        if slots is None or slots[0] != limit:
+            slots = _slots[source_id] = (limit, threading.BoundedSemaphore(limit))
+        return slots[1]
+
+def frame_bytes(df) -> int:
+    """In-memory size of a DataFrame batch, including string payloads."""
+    return int(df.memory_usage(index=False, deep=True).sum())
+
+def rows_bytes(rows, sample: int = 100) -> int:
+    """Approximate size of a batch of row tuples, extrapolated from up to `sample` rows."""
+    if not rows:
+        return 0
+    step = max(len(rows) // sample, 1)
+    picked = rows[::step]
+    size = sum(sys.getsizeof(v) for row in picked for v in row)
+    return int(size * len(rows) / len(picked))
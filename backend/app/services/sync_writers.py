@@ -0,0 +1,320 @@
+import csv
+import io
+import os
+import re
+import tempfile
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+# Bulk writers for the system MySQL sync target.
+# A writer owns one pooled connection for its lifetime and commits once every
+# `commit_every` chunks instead of letting pandas open a new engine per chunk.
+# Modes: "append" inserts, "overwrite" replaces the table on the first chunk, and
+# "merge" upserts rows by the target's primary or unique key.
+
+class TableWriter:
+    def __init__(self, engine, table: str, mode: str = "append", commit_every: int = 1, batch_size: int = 1000,
+                 ddl: str = None, key=None):
+        self.engine = engine
+        self.table = table
+        self.mode = mode
+        self.ddl = ddl  # CREATE TABLE IF NOT EXISTS statement; pandas infers the schema when None
+        self.key = list(key or [])  # merge key; merge mode makes sure a unique key covers it
+        self.commit_every = max(int(commit_every), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.rows_written = 0
+        self._conn = None
+        self._tx = None
+        self._pending_chunks = 0
+        self._prepared = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = self.engine.connect()
+        return self._conn
+
+    def _quote(self, name: str) -> str:
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def _begin(self):
+        if self._tx is None:
+            self._tx = self.conn.begin()
+
+    def prepare(self, df: pd.DataFrame):
+        """
+        Create the target table from the writer's DDL, or from the chunk's dtypes without one.
+        Overwrite mode drops an existing table first.
+        """
+        if self.ddl:
+            if self.mode == "overwrite":
+                self.conn.exec_driver_sql(f"DROP TABLE IF EXISTS {self._quote(self.table)}")
+            self.conn.exec_driver_sql(self.ddl)
+        else:
+            if_exists = "replace" if self.mode == "overwrite" else "append"
+            _schema_frame(df).to_sql(self.table, self.conn, if_exists=if_exists, index=False)
+        if self.mode == "merge" and self.key:
+            self._ensure_merge_key()
+        self.conn.commit()
+        self._prepared = True
+
+    def _ensure_merge_key(self):
+        """
+        Upserts only find existing rows through a primary or unique key on exactly the merge
+        key, otherwise they silently append. Tables without one (created by an append run,
+        or from source DDL keyed on other columns) get a unique index on the merge key.
+        """
+        tables = inspect(self.conn)
+        keys = [tables.get_pk_constraint(self.table).get("constrained_columns") or []]
+        keys += [u["column_names"] for u in tables.get_unique_constraints(self.table)]
+        keys += [i["column_names"] for i in tables.get_indexes(self.table) if i.get("unique")]
+        if any(set(cols) == set(self.key) for cols in keys):
+            return
+        cols = ", ".join(self._quote(c) for c in self.key)
+        index = self._quote(f"ux_{self.table}_merge")
+        print(f"Adding unique index on ({', '.join(self.key)}) to merge target {self.table}")
+        try:
+            self.conn.exec_driver_sql(f"CREATE UNIQUE INDEX {index} ON {self._quote(self.table)} ({cols})")
+        except Exception as e:
+            raise Exception(f"Merge target {self.table} has no unique key on ({', '.join(self.key)}) and one could not be added: {e}")
+
+    def write(self, df: pd.DataFrame):
+        if not self._prepared:
+            self.prepare(df)
+        if df.empty:
+            return
+        self._begin()
+        self._write_rows(df)
+        self.rows_written += len(df)
+        self._pending_chunks += 1
+        if self._pending_chunks >= self.commit_every:
+            self.commit()
+
+    @property
+    def has_pending(self) -> bool:
+        """True while written chunks are waiting for the next commit."""
+        return self._pending_chunks > 0
+
+    def _write_rows(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def commit(self):
+        if self._tx is not None:
+            self._tx.commit()
+            self._tx = None
+        self._pending_chunks = 0
+
+    def abort(self):
+        if self._tx is not None:
+            try:
+                self._tx.rollback()
+            except Exception as e:
+                print(f"Rollback failed for {self.table}: {e}")
+            self._tx = None
+        self._release()
+
+    def close(self):
+        self.commit()
+        self._release()
+
+    def _release(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _schema_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Empty frame carrying the column types. pandas cannot infer SQL types from empty
+    # Arrow-backed columns, so those are mapped to their numpy equivalents first.
+    schema = df.head(0).copy()
+    for c in schema.columns:
+        if isinstance(schema[c].dtype, pd.ArrowDtype):
+            schema[c] = schema[c].astype(schema[c].dtype.numpy_dtype)
+    return schema
+
+
+class ToSqlWriter(TableWriter):
+    """pandas to_sql on the shared connection (kept for targets the other writers don't support)."""
+
+    def _write_rows(self, df: pd.DataFrame):
+        df.to_sql(self.table, self.conn, if_exists="append", index=False, chunksize=self.batch_size)
+
+
+def _to_records(df: pd.DataFrame):
+    # Plain Python values with None for NaN/NaT, which every DBAPI driver can escape
+    return df.astype(object).where(pd.notna(df), None).itertuples(index=False, name=None)
+
+
+class ExecuteManyWriter(TableWriter):
+    """
+    Multi-row INSERT batches. With pymysql, executemany() rewrites the statement into
+    one INSERT ... VALUES (...), (...) per batch, including in merge mode's
+    INSERT ... ON DUPLICATE KEY UPDATE.
+    """
+
+    def _upsert_clause(self, cols) -> str:
+        if self.engine.dialect.name == "mysql":
+            updates = ", ".join(f"{self._quote(c)} = VALUES({self._quote(c)})" for c in cols)
+            return f" ON DUPLICATE KEY UPDATE {updates}"
+        # SQLite (3.35+) and PostgreSQL spelling
+        updates = ", ".join(f"{self._quote(c)} = excluded.{self._quote(c)}" for c in cols)
+        target = f"({', '.join(self._quote(c) for c in self.key)}) " if self.key else ""
+        return f" ON CONFLICT {target}DO UPDATE SET {updates}"
+
+    def _write_rows(self, df: pd.DataFrame):
+        cols = list(df.columns)
+        binds = [f"p{i}" for i in range(len(cols))]
+        upsert = self._upsert_clause(cols) if self.mode == "merge" else ""
+        sql = text(
+            f"INSERT INTO {self._quote(self.table)} ({', '.join(self._quote(c) for c in cols)}) "
+            f"VALUES ({', '.join(':' + b for b in binds)}){upsert}"
+        )
+        batch = []
+        for row in _to_records(df):
+            batch.append(dict(zip(binds, row)))
+            if len(batch) >= self.batch_size:
+                self.conn.execute(sql, batch)
+                batch = []
+        if batch:
+            self.conn.execute(sql, batch)
+
+
+_BINARY = (bytes, bytearray, memoryview)
+
+
+class LoadDataWriter(TableWriter):
+    """
+    LOAD DATA LOCAL INFILE fed from a CSV buffer built in memory.
+    pymysql only streams LOCAL INFILE from a file path, so the buffer is spilled
+    to a temporary file for the duration of the statement.
+    Requires local_infile to be enabled on the server and the connection.
+    Merge mode loads with REPLACE, which swaps in the whole row on a duplicate key.
+    Binary values (BLOB, BINARY, VARBINARY) are written as hex and loaded through
+    UNHEX(), since the CSV is text.
+    """
+
+    def _write_rows(self, df: pd.DataFrame):
+        out = df.copy()
+        targets, binary = [], []
+        for i, c in enumerate(out.columns):
+            target = self._quote(c)
+            if pd.api.types.is_bool_dtype(out[c].dtype):
+                out[c] = out[c].astype("Int64")
+            elif out[c].dtype == object and out[c].map(lambda v: isinstance(v, _BINARY)).any():
+                out[c] = out[c].map(lambda v: bytes(v).hex() if isinstance(v, _BINARY) else v)
+                target = f"@b{i}"
+                binary.append(f"{self._quote(c)} = UNHEX(@b{i})")
+            elif out[c].dtype == object or pd.api.types.is_string_dtype(out[c].dtype):
+                # Backslash is the LOAD DATA escape character
+                out[c] = out[c].map(lambda v: v.replace("\\", "\\\\") if isinstance(v, str) else v)
+            targets.append(target)
+
+        buf = io.StringIO()
+        out.to_csv(buf, index=False, header=False, na_rep="\\N", quoting=csv.QUOTE_MINIMAL, lineterminator="\n")
+
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                f.write(buf.getvalue())
+            cols = ", ".join(targets)
+            set_clause = f" SET {', '.join(binary)}" if binary else ""
+            infile = path.replace("\\", "/")
+            replace = "REPLACE " if self.mode == "merge" else ""
+            self.conn.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{infile}' {replace}INTO TABLE {self._quote(self.table)} "
+                f"CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '\\\\' "
+                f"LINES TERMINATED BY '\\n' ({cols}){set_clause}"
+            )
+        finally:
+            os.remove(path)
+
+
+WRITERS = {
+    "to_sql": ToSqlWriter,
+    "executemany": ExecuteManyWriter,
+    "load_data": LoadDataWriter,
+}
+
+def create_target_engine(target_url: str, target_conf: dict, pool_size: int = 1):
+    """
+    One engine per sync task; writers check connections out of its pool.
+    """
+    kwargs = {}
+    if target_url.startswith("mysql"):
+        kwargs["pool_size"] = max(pool_size, 1)
+        kwargs["max_overflow"] = 0
+        kwargs["pool_pre_ping"] = True
+        if target_conf.get("writer") == "load_data":
+            kwargs["connect_args"] = {"local_infile": True}
+    return create_engine(target_url, **kwargs)
+
+def create_writer(engine, table: str, mode: str, target_conf: dict, ddl: str = None, key=None) -> TableWriter:
+    """
+    Build the writer selected by target.writer (default: executemany).
+    target.batch_size sets rows per INSERT batch, target.commit_every the chunks per transaction.
+    ddl, if given, creates the table instead of pandas' dtype inference.
+    key is the merge key for mode="merge".
+    """
+    name = target_conf.get("writer", "executemany")
+    if name == "load_data" and engine.dialect.name != "mysql":
+        print(f"LOAD DATA is MySQL-only, using executemany for {engine.dialect.name}")
+        name = "executemany"
+    if name == "to_sql" and mode == "merge":
+        print("to_sql cannot upsert, using executemany for merge mode")
+        name = "executemany"
+    writer_cls = WRITERS.get(name)
+    if not writer_cls:
+        raise ValueError(f"Unsupported sync writer: {name}")
+    return writer_cls(
+        engine,
+        table,
+        mode=mode,
+        commit_every=target_conf.get("commit_every", 1),
+        batch_size=target_conf.get("batch_size", 1000),
+        ddl=ddl,
+        key=key,
+    )
+
+def mysql_table_ddl(source_engine, source_table: str, target_table: str):
+    """
+    CREATE TABLE IF NOT EXISTS statement for target_table built from the source's
+    SHOW CREATE TABLE, so column types, primary key and indexes carry over.
+    Foreign keys (their parents may not be synced), CHECK constraint names and the
+    AUTO_INCREMENT counter are dropped, and generated columns become plain columns that
+    receive the copied values.
+    Returns None if the source is not MySQL or its DDL cannot be read.
+    """
+    if source_engine.dialect.name != "mysql":
+        return None
+    try:
+        with source_engine.connect() as conn:
+            ddl = conn.execute(text(f"SHOW CREATE TABLE {source_table}")).one()[1]
+    except Exception as e:
+        print(f"Could not read DDL of {source_table}, inferring target schema: {e}")
+        return None
+
+    lines = ddl.split("\n")
+    # The column list ends at the first line starting with ")", which holds the table options.
+    # A partitioned table's /*!50100 PARTITION BY ... */ block follows and is kept as is.
+    close = next((i for i, l in enumerate(lines) if i > 0 and l.startswith(")")), len(lines) - 1)
+    body = [l for l in lines[1:close] if "FOREIGN KEY" not in l]
+    body = [re.sub(r"\s+GENERATED ALWAYS AS \(.*\) (VIRTUAL|STORED)", "", l) for l in body]
+    # CHECK constraint names are unique per schema, so the copy (or a shadow table next to
+    # the live one) lets MySQL generate <table>_chk_N names, which RENAME TABLE follows
+    body = [re.sub(r"^(\s*)CONSTRAINT `(?:[^`]|``)+` (CHECK \()", r"\1\2", l) for l in body]
+    body = [l.rstrip().rstrip(",") for l in body]
+    options = re.sub(r"\s*AUTO_INCREMENT=\d+", "", lines[close])
+    partitions = "".join("\n" + l for l in lines[close + 1:])
+    quoted = "`" + target_table.replace("`", "``") + "`"
+    return f"CREATE TABLE IF NOT EXISTS {quoted} (\n" + ",\n".join(body) + "\n" + options + partitions
@@ -0,0 +1,247 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session, select, update
+from backend.app.core.db import engine
+from backend.app.core.config import settings
+from backend.app.models.task import DataTask
+from backend.app.models.datasource import DataSource
+from backend.app.models.audit import AuditLog
+
+# DB-backed task queue and scheduler shared by the worker processes (backend/app/worker.py).
+# Tasks are claimed with a conditional UPDATE (status still "queued"), so any number of
+# workers on any number of hosts can poll the same table without double-running a task.
+# Which queued task a free worker takes is decided by schedule_order and _admit.
+
+def enqueue_task(session: Session, task: DataTask):
+    """Mark a task queued; the caller commits."""
+    task.status = "queued"
+    task.progress = 0
+    task.queued_at = datetime.utcnow()
+    task.updated_at = task.queued_at
+    task.worker_id = None
+    task.heartbeat_at = None
+    task.attempts = 0
+    session.add(task)
+
+def _source_id(task: DataTask):
+    try:
+        return json.loads(task.config).get("source_id")
+    except Exception:
+        return None
+
+def _count_per_source(tasks) -> dict:
+    counts = {}
+    for task in tasks:
+        source_id = _source_id(task)
+        if source_id is not None:
+            counts[source_id] = counts.get(source_id, 0) + 1
+    return counts
+
+def _running(session: Session):
+    return session.exec(select(DataTask).where(DataTask.status == "running")).all()
+
+def _source_limit(session: Session, source_id) -> int:
+    # connection_info.max_tasks caps concurrent tasks reading this DataSource
+    ds = session.get(DataSource, source_id)
+    try:
+        conn_info = json.loads(ds.connection_info) if ds else {}
+    except Exception:
+        conn_info = {}
+    return max(int(conn_info.get("max_tasks") or settings.WORKER_TASKS_PER_SOURCE), 1)
+
+def _task_class(task: DataTask) -> str:
+    return "sync" if task.task_type == "sync" else "preprocess"
+
+def _estimated_rows(task: DataTask) -> int:
+    if task.estimated_rows is not None:
+        return task.estimated_rows
+    return settings.SCHEDULER_DEFAULT_SYNC_ROWS if _task_class(task) == "sync" else 0
+
+def _effective_priority(task: DataTask, now: datetime) -> float:
+    # Aging keeps low-priority tasks from waiting forever behind a stream of urgent ones
+    waited = (now - (task.queued_at or now)).total_seconds()
+    return task.priority + waited / settings.SCHEDULER_AGING_SECONDS
+
+def schedule_order(queued, running, now: datetime = None) -> list:
+    """
+    Order queued tasks for claiming. Task classes (sync, preprocess) share workers by
+    SCHEDULER_WEIGHTS: the next pick comes from the class with the fewest running-plus-picked
+    tasks per unit of weight, so with weights 1:3 a sync gets every fourth free worker.
+    Within a class, higher (aged) priority goes first, then FIFO.
+    """
+    now = now or datetime.utcnow()
+    weights = settings.SCHEDULER_WEIGHTS
+    by_class = {}
+    for task in queued:
+        by_class.setdefault(_task_class(task), []).append(task)
+    for tasks in by_class.values():
+        tasks.sort(key=lambda t: (-_effective_priority(t, now), t.queued_at or now, t.id))
+
+    load = {cls: 0 for cls in by_class}
+    for task in running:
+        cls = _task_class(task)
+        if cls in load:
+            load[cls] += 1
+
+    order = []
+    while by_class:
+        # Stride scheduling: the class whose share would stay lowest after this pick goes next
+        cls = min(by_class, key=lambda c: ((load[c] + 1) / max(weights.get(c, 1), 1e-9), -_effective_priority(by_class[c][0], now)))
+        order.append(by_class[cls].pop(0))
+        load[cls] += 1
+        if not by_class[cls]:
+            del by_class[cls]
+    return order
+
+def _admit(task: DataTask, running) -> bool:
+    """
+    Admission control: interactive tasks (estimate at or below SCHEDULER_SMALL_TASK_ROWS)
+    always start. Bulk tasks start while fewer than SCHEDULER_MAX_BULK_TASKS bulk tasks run
+    and the running estimate stays within SCHEDULER_MAX_RUNNING_ROWS (one bulk task is
+    always allowed, however large).
+    """
+    rows = _estimated_rows(task)
+    if rows <= settings.SCHEDULER_SMALL_TASK_ROWS:
+        return True
+    bulk = [t for t in running if _estimated_rows(t) > settings.SCHEDULER_SMALL_TASK_ROWS]
+    if not bulk:
+        return True
+    max_bulk = settings.SCHEDULER_MAX_BULK_TASKS or max(settings.WORKER_PROCESSES - 1, 1)
+    if len(bulk) >= max_bulk:
+        return False
+    return sum(_estimated_rows(t) for t in running) + rows <= settings.SCHEDULER_MAX_RUNNING_ROWS
+
+def claim_task(worker_id: str, scan: int = 200) -> Optional[int]:
+    """
+    Claim the first queued task in schedule order that passes admission control and whose
+    DataSource is below its concurrency cap, and mark it running for `worker_id`.
+    Returns the task id, or None when nothing can run now.
+    """
+    with Session(engine) as session:
+        queued = session.exec(
+            select(DataTask).where(DataTask.status == "queued")
+            .order_by(DataTask.priority.desc(), DataTask.queued_at, DataTask.id).limit(scan)
+        ).all()
+        if not queued:
+            return None
+
+        running = list(_running(session))
+        per_source = _count_per_source(running)
+        limits = {}
+        for task in schedule_order(queued, running):
+            source_id = _source_id(task)
+            if source_id is not None:
+                if source_id not in limits:
+                    limits[source_id] = _source_limit(session, source_id)
+                if per_source.get(source_id, 0) >= limits[source_id]:
+                    continue
+            if not _admit(task, running):
+                continue
+
+            now = datetime.utcnow()
+            claimed = session.exec(
+                update(DataTask)
+                .where(DataTask.id == task.id, DataTask.status == "queued")
+                .values(status="running", worker_id=worker_id, heartbeat_at=now, updated_at=now,
+                        attempts=DataTask.attempts + 1)
+            )
+            session.commit()
+            if claimed.rowcount != 1:
+                continue  # another worker got it first
+
+            if source_id is not None and _count_per_source(_running(session)).get(source_id, 0) > limits[source_id]:
+                # Another worker took the source's last slot at the same time; hand the task back
+                session.exec(
+                    update(DataTask)
+                    .where(DataTask.id == task.id, DataTask.worker_id == worker_id)
+                    .values(status="queued", worker_id=None, heartbeat_at=None, attempts=DataTask.attempts - 1)
+                )
+                session.commit()
+                per_source[source_id] = limits[source_id]
+                continue
+            return task.id
+    return None
+
+def heartbeat(task_id: int, worker_id: str) -> bool:
+    """Refresh the task's heartbeat. False when `worker_id` no longer owns the running task."""
+    with Session(engine) as session:
+        result = session.exec(
+            update(DataTask)
+            .where(DataTask.id == task_id, DataTask.worker_id == worker_id, DataTask.status == "running")
+            .values(heartbeat_at=datetime.utcnow())
+        )
+        session.commit()
+        return result.rowcount == 1
+
+class TaskLost(Exception):
+    """The worker running a task no longer owns it (it was requeued after missed heartbeats)."""
+
+# Tasks running in this process: task_id -> (worker_id, Event set once ownership is lost).
+# Runners check their lease before committing progress that another worker could also be
+# writing (checkpoints, watermarks, final status). Tasks run outside a worker have no lease.
+_leases = {}
+_leases_lock = threading.Lock()
+
+def acquire_lease(task_id: int, worker_id: str) -> threading.Event:
+    lost = threading.Event()
+    with _leases_lock:
+        _leases[task_id] = (worker_id, lost)
+    return lost
+
+def release_lease(task_id: int):
+    with _leases_lock:
+        _leases.pop(task_id, None)
+
+def lease_lost(task_id: int, session: Session = None) -> bool:
+    """
+    Whether this process's worker lost `task_id`: its heartbeat found the task taken, or,
+    with a session, the task row now names another worker or is no longer running.
+    """
+    with _leases_lock:
+        lease = _leases.get(task_id)
+    if lease is None:
+        return False
+    worker_id, lost = lease
+    if not lost.is_set() and session is not None:
+        row = session.exec(select(DataTask.worker_id, DataTask.status).where(DataTask.id == task_id)).first()
+        if row is None or row[0] != worker_id or row[1] != "running":
+            lost.set()
+    return lost.is_set()
+
+def check_lease(task_id: int, session: Session = None):
+    """Raise TaskLost if this process's worker no longer owns `task_id`."""
+    if lease_lost(task_id, session):
+        raise TaskLost(f"Task {task_id} was taken over by another worker, stopping this run")
+
+def requeue_stale_tasks() -> int:
+    """
+    Requeue running tasks whose worker stopped heartbeating (crash, restart, killed host).
+    Sync tasks resume from their checkpoints. A task that already used WORKER_MAX_ATTEMPTS
+    runs is failed instead. Returns the number of tasks requeued or failed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.WORKER_STALE_SECONDS)
+    with Session(engine) as session:
+        stale = session.exec(
+            select(DataTask).where(
+                DataTask.status == "running",
+                DataTask.worker_id != None,
+                DataTask.heartbeat_at < cutoff,
+            )
+        ).all()
+        for task in stale:
+            print(f"Task {task.id} lost its worker {task.worker_id} (last heartbeat {task.heartbeat_at})")
+            if task.attempts >= settings.WORKER_MAX_ATTEMPTS:
+                task.status = "failed"
+                session.add(AuditLog(user_id="system", action="task_failed", resource=task.name,
+                                     details=f"Worker {task.worker_id} stopped responding after {task.attempts} attempts"))
+            else:
+                task.status = "queued"
+                task.queued_at = datetime.utcnow()
+            task.worker_id = None
+            task.heartbeat_at = None
+            task.updated_at = datetime.utcnow()
+            session.add(task)
+        session.commit()
+        return len(stale)
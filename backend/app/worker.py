@@ -0,0 +1,117 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+from backend.app.core.config import settings
+from backend.app.services import task_queue
+
+# Task worker processes. Each process polls the task queue, runs one task at a time and
+# heartbeats it while it runs, so syncs and Spark jobs no longer share the API's threadpool.
+#
+#   python -m backend.app.worker --processes 4
+#
+# With WORKER_EMBEDDED (the default) the API starts WORKER_PROCESSES workers itself.
+
+def _run_task(task_id: int):
+    from sqlmodel import Session
+    from backend.app.core.db import engine
+    from backend.app.models.task import DataTask
+    from backend.app.services.sync_service import run_sync_task
+    from backend.app.api.task import run_spark_job_background
+
+    with Session(engine) as session:
+        task = session.get(DataTask, task_id)
+        task_type = task.task_type if task else None
+    if task_type == "sync":
+        run_sync_task(task_id)
+    elif task_type:
+        run_spark_job_background(task_id)
+
+def _heartbeat_loop(task_id: int, worker_id: str, done: threading.Event, lost: threading.Event):
+    while not done.wait(settings.WORKER_HEARTBEAT_SECONDS):
+        try:
+            if not task_queue.heartbeat(task_id, worker_id):
+                # Requeued after missed heartbeats (e.g. a DB outage); the runner stops at its next check
+                print(f"Worker {worker_id} lost task {task_id} to a requeue")
+                lost.set()
+                return
+        except Exception as e:
+            print(f"Heartbeat for task {task_id} failed: {e}")
+
+def run_worker(worker_id: str, stop=None, run_task=_run_task):
+    """Claim and run tasks until `stop` (a threading or multiprocessing Event) is set."""
+    stop = stop or threading.Event()
+    print(f"Worker {worker_id} started")
+    while not stop.is_set():
+        try:
+            task_queue.requeue_stale_tasks()
+            task_id = task_queue.claim_task(worker_id)
+        except Exception as e:
+            print(f"Worker {worker_id} could not poll the task queue: {e}")
+            task_id = None
+        if task_id is None:
+            stop.wait(settings.WORKER_POLL_SECONDS)
+            continue
+
+        print(f"Worker {worker_id} running task {task_id}")
+        done = threading.Event()
+        lost = task_queue.acquire_lease(task_id, worker_id)
+        beat = threading.Thread(target=_heartbeat_loop, args=(task_id, worker_id, done, lost), daemon=True)
+        beat.start()
+        try:
+            run_task(task_id)
+        except Exception:
+            # Task runners record their own failures; this only keeps the worker alive
+            traceback.print_exc()
+        finally:
+            done.set()
+            beat.join()
+            task_queue.release_lease(task_id)
+    print(f"Worker {worker_id} stopped")
+
+def _worker_main(index: int, stop):
+    run_worker(f"{socket.gethostname()}:{os.getpid()}:{index}", stop)
+
+def start_workers(count: int):
+    """
+    Start `count` worker processes. Returns (processes, stop_event); set the event and
+    call stop_workers to shut them down after their current task.
+    """
+    # spawn, so workers don't inherit the parent's DB connections or server threads
+    ctx = multiprocessing.get_context("spawn")
+    stop = ctx.Event()
+    processes = []
+    for index in range(count):
+        p = ctx.Process(target=_worker_main, args=(index, stop), name=f"task-worker-{index}", daemon=True)
+        p.start()
+        processes.append(p)
+    return processes, stop
+
+def stop_workers(processes, stop, timeout: float = 10.0):
+    # Tasks still running after the timeout are killed; their heartbeats lapse and
+    # another worker requeues them
+    stop.set()
+    for p in processes:
+        p.join(timeout)
+        if p.is_alive():
+            p.terminate()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run task worker processes")
+    parser.add_argument("--processes", type=int, default=settings.WORKER_PROCESSES)
+    args = parser.parse_args()
+
+    from backend.app.core.db import create_db_and_tables
+    create_db_and_tables()
+
+    processes, stop = start_workers(args.processes)
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        stop_workers(processes, stop)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+from sqlmodel import create_engine, text, Session
+from backend.app.core.config import settings
+
+# Columns added to syncstate after the table was first created
+COLUMNS = {
+    "checkpoint": "TEXT DEFAULT NULL",
+    "status": "VARCHAR(50) DEFAULT NULL",
+    "progress": "INTEGER NOT NULL DEFAULT 0",
+    "rows": "INTEGER NOT NULL DEFAULT 0",
+    "verification_status": "VARCHAR(50) DEFAULT NULL",
+    "message": "TEXT DEFAULT NULL",
+}
+
+def migrate():
+    url = settings.get_database_url()
+    print(f"Connecting to {url}")
+    engine = create_engine(url)
+    
+    for column, ddl in COLUMNS.items():
+        with Session(engine) as session:
+            try:
+                # Check if column exists
+                session.exec(text(f"SELECT `{column}` FROM syncstate LIMIT 1"))
+                print(f"Column '{column}' already exists.")
+            except Exception:
+                print(f"Column '{column}' missing. Adding it...")
+                try:
+                    session.exec(text(f"ALTER TABLE syncstate ADD COLUMN `{column}` {ddl}"))
+                    session.commit()
+                    print(f"Added '{column}' column.")
+                except Exception as e:
+                    print(f"Failed to add column: {e}")
+
+if __name__ == "__main__":
+    migrate()
@@ -1,24 +1,36 @@
 from sqlmodel import create_engine, text, Session
 from backend.app.core.config import settings
 
+# Columns added to datatask after the table was first created
+COLUMNS = {
+    "progress": "INTEGER DEFAULT 0",
+    "queued_at": "DATETIME DEFAULT NULL",
+    "worker_id": "VARCHAR(255) DEFAULT NULL",
+    "heartbeat_at": "DATETIME DEFAULT NULL",
+    "attempts": "INTEGER NOT NULL DEFAULT 0",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+    "estimated_rows": "BIGINT DEFAULT NULL",
+}
+
 def migrate():
     url = settings.get_database_url()
     print(f"Connecting to {url}")
     engine = create_engine(url)
     
-    with Session(engine) as session:
-        try:
-            # Check if column exists
-            session.exec(text("SELECT progress FROM datatask LIMIT 1"))
-            print("Column 'progress' already exists.")
-        except Exception:
-            print("Column 'progress' missing. Adding it...")
+    for column, ddl in COLUMNS.items():
+        with Session(engine) as session:
             try:
-                session.exec(text("ALTER TABLE datatask ADD COLUMN progress INTEGER DEFAULT 0"))
-                session.commit()
-                print("Added 'progress' column.")
-            except Exception as e:
-                print(f"Failed to add column: {e}")
+                # Check if column exists
+                session.exec(text(f"SELECT `{column}` FROM datatask LIMIT 1"))
+                print(f"Column '{column}' already exists.")
+            except Exception:
+                print(f"Column '{column}' missing. Adding it...")
+                try:
+                    session.exec(text(f"ALTER TABLE datatask ADD COLUMN `{column}` {ddl}"))
+                    session.commit()
+                    print(f"Added '{column}' column.")
+                except Exception as e:
+                    print(f"Failed to add column: {e}")
 
 if __name__ == "__main__":
     migrate()
@@ -0,0 +1,203 @@
+import argparse
+import io
+import os
+import socket
+import sys
+import threading
+import traceback
+from multiprocessing.connection import Listener
+
+from backend.spark_jobs import preprocess_job
+from backend.spark_jobs.progress import BoundedLog, parse_progress
+
+# Long-lived job runner. Keeps one SparkSession warm and runs preprocess job configs sent
+# over a local multiprocessing.connection socket, so a job no longer pays for interpreter
+# start, imports, JVM launch and session creation.
+#
+# Requests are dicts: {"op": "run", "config": {...}, "group": "task-12"},
+# {"op": "cancel", "group": "task-12"} or {"op": "ping"}.
+# While a job runs the daemon relays its PROGRESS lines as {"progress": {...}} messages,
+# then replies {"ok": bool, "output": str} once the job has finished.
+#
+#   SPARK_DAEMON_AUTHKEY=... python backend/spark_jobs/job_daemon.py --port 7078
+
+class _ThreadOutput(io.TextIOBase):
+    """
+    sys.stdout/sys.stderr stand-in that also copies writes from a job's thread into that
+    job's buffer, so concurrent jobs each get their own output back.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self, sink):
+        self._local.sink = sink
+
+    def write(self, s):
+        sink = getattr(self._local, "sink", None)
+        if sink is not None:
+            sink.write(s)
+        return self._stream.write(s)
+
+    def flush(self):
+        self._stream.flush()
+
+
+class _JobOutput:
+    """A job's output: PROGRESS lines go to on_progress, the rest to a BoundedLog."""
+
+    def __init__(self, on_progress=None, max_lines: int = 2000):
+        self.log = BoundedLog(max_lines)
+        self._on_progress = on_progress
+        self._partial = ""
+
+    def write(self, s):
+        self._partial += s
+        *lines, self._partial = self._partial.split("\n")
+        if len(self._partial) > 64 * 1024:
+            # A runaway line without newlines is logged in pieces rather than buffered whole
+            lines.append(self._partial)
+            self._partial = ""
+        for line in lines:
+            progress = parse_progress(line)
+            if progress is None:
+                self.log.append(line)
+            elif self._on_progress:
+                self._on_progress(progress)
+
+    def text(self) -> str:
+        if self._partial:
+            self.log.append(self._partial)
+            self._partial = ""
+        return self.log.text()
+
+
+class JobDaemon:
+    def __init__(self, address, authkey: bytes, max_jobs: int = 2, spark_factory=None, log_lines: int = 2000):
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+        self._slots = threading.BoundedSemaphore(max(int(max_jobs), 1))
+        self._spark_factory = spark_factory or (lambda: preprocess_job.get_spark_session("PreprocessJobDaemon"))
+        self._spark = None
+        self._spark_lock = threading.Lock()
+        self._stdout = _ThreadOutput(sys.stdout)
+        self._stderr = _ThreadOutput(sys.stderr)
+        self._log_lines = log_lines
+        self._closed = False
+        self._serving = threading.Event()
+        self._stopped = threading.Event()
+
+    def spark(self):
+        # Created on the first job; None when PySpark is unavailable (jobs then run on pandas)
+        if not preprocess_job.SPARK_AVAILABLE:
+            return None
+        with self._spark_lock:
+            if self._spark is None:
+                self._spark = self._spark_factory()
+            return self._spark
+
+    def run(self, config: dict, group: str, on_progress=None):
+        """Run one job in its own Spark job group and session. Returns (ok, output)."""
+        out = _JobOutput(on_progress, self._log_lines)
+        self._stdout.capture(out)
+        self._stderr.capture(out)
+        try:
+            with self._slots:
+                spark = self.spark()
+                if spark is not None:
+                    # Job groups are per thread; they tag the job's stages and let it be cancelled alone.
+                    # newSession() isolates SQL conf and temp views while sharing the warm SparkContext.
+                    spark.sparkContext.setJobGroup(group, config.get("job_name", group), interruptOnCancel=True)
+                    spark = spark.newSession()
+                preprocess_job.run_job(config, spark=spark)
+            return True, out.text()
+        except Exception as e:
+            traceback.print_exc()
+            return False, out.text() or str(e)
+        finally:
+            self._stdout.capture(None)
+            self._stderr.capture(None)
+
+    def cancel(self, group: str):
+        if self._spark is not None:
+            self._spark.sparkContext.cancelJobGroup(group)
+
+    def _handle(self, conn):
+        try:
+            with conn:
+                request = conn.recv()
+                op = request.get("op")
+                if op == "run":
+                    def relay(progress):
+                        try:
+                            conn.send({"progress": progress})
+                        except OSError:
+                            pass  # the client went away; the job still runs to completion
+
+                    ok, output = self.run(request["config"], request.get("group") or "job", relay)
+                    conn.send({"ok": ok, "output": output})
+                elif op == "cancel":
+                    self.cancel(request["group"])
+                    conn.send({"ok": True})
+                elif op == "ping":
+                    conn.send({"ok": True, "pid": os.getpid()})
+                else:
+                    conn.send({"ok": False, "output": f"Unknown request: {op}"})
+        except (EOFError, OSError) as e:
+            print(f"Job daemon client disconnected: {e}")
+
+    def serve_forever(self):
+        sys.stdout, sys.stderr = self._stdout, self._stderr
+        print(f"Job daemon listening on {self.address}")
+        self._serving.set()
+        try:
+            while not self._closed:
+                try:
+                    conn = self.listener.accept()
+                except Exception:
+                    # Includes clients that fail the authkey challenge; they must not stop the daemon
+                    if self._closed:
+                        break
+                    traceback.print_exc()
+                    continue
+                if self._closed:
+                    conn.close()
+                    break
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self._stopped.set()
+
+    def close(self):
+        self._closed = True
+        if self._serving.is_set() and not self._stopped.is_set():
+            # Closing the listener does not interrupt an accept() blocked in another thread,
+            # so wake it with a connection of our own and wait for the loop to exit
+            try:
+                socket.create_connection(self.address, timeout=1).close()
+            except OSError:
+                pass
+            self._stopped.wait(5)
+        self.listener.close()
+        if sys.stdout is self._stdout:
+            sys.stdout, sys.stderr = self._stdout._stream, self._stderr._stream
+        if self._spark is not None:
+            self._spark.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7078)
+    parser.add_argument("--max-jobs", type=int, default=2)
+    parser.add_argument("--log-lines", type=int, default=2000)
+    args = parser.parse_args()
+
+    authkey = os.environ.get("SPARK_DAEMON_AUTHKEY", "").encode()
+    if not authkey:
+        sys.exit("SPARK_DAEMON_AUTHKEY must be set")
+    daemon = JobDaemon((args.host, args.port), authkey, max_jobs=args.max_jobs, log_lines=args.log_lines)
+    try:
+        daemon.serve_forever()
+    finally:
+        daemon.close()
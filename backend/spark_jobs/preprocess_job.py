@@ -19,6 +19,7 @@ except ImportError:
 
 import pandas as pd
 from sqlalchemy import create_engine, text
+from backend.spark_jobs.progress import report_progress
 
 def get_spark_session(app_name: str):
     return SparkSession.builder \
@@ -73,18 +74,90 @@ def register_asset(config, table_name, source_type, row_count=0):
     except Exception as e:
         print(f"Error registering asset: {e}")
 
+def _arrow_transport(config) -> bool:
+    # transport = "arrow" reads into Arrow-backed DataFrames and writes ClickHouse as ArrowStream
+    if config.get("transport") != "arrow":
+        return False
+    from backend.app.services.arrow_transport import ARROW_AVAILABLE
+    if not ARROW_AVAILABLE:
+        print("pyarrow is not installed, falling back to row transport")
+        return False
+    return True
+
+def _clickhouse_column_type(series) -> str:
+    """
+    ClickHouse type for a pandas column. Columns with missing values become Nullable,
+    and strings with few distinct values become LowCardinality.
+    """
+    dtype = str(series.dtype).lower()
+    if "bool" in dtype:
+        base = "Bool"
+    elif "int" in dtype:
+        base = "UInt64" if dtype.startswith("uint") else "Int64"
+    elif "float" in dtype or "double" in dtype or "decimal" in dtype:
+        base = "Float64"
+    elif "datetime" in dtype or "timestamp" in dtype:
+        base = "DateTime64(3)"
+    else:
+        base = "String"
+
+    col_type = f"Nullable({base})" if series.isna().any() else base
+    if base == "String":
+        values = series.dropna()
+        distinct = values.nunique()
+        # LowCardinality pays off for dictionary-sized value sets that repeat a lot
+        if len(values) and distinct <= 10000 and distinct <= len(values) * 0.5:
+            col_type = f"LowCardinality({col_type})"
+    return col_type
+
+def _clickhouse_order_by(df, col_types: dict) -> str:
+    # Sort by the repetitive low-cardinality columns (fewest values first), then the first
+    # timestamp, which clusters rows for the usual filter-then-range queries.
+    # Nullable columns cannot be part of the sorting key.
+    keys = sorted(
+        (c for c, t in col_types.items() if t == "LowCardinality(String)"),
+        key=lambda c: df[c].nunique(),
+    )[:2]
+    keys += [c for c, t in col_types.items() if t == "DateTime64(3)"][:1]
+    if not keys:
+        keys = [c for c, t in col_types.items() if t in ("Int64", "UInt64")][:1]
+    return f"({', '.join(f'`{c}`' for c in keys)})" if keys else "tuple()"
+
+def clickhouse_create_table(table: str, df, target: dict) -> str:
+    """
+    CREATE TABLE for a pandas result. target.order_by / target.partition_by override
+    the inferred sorting key and add a partition key.
+    """
+    col_types = {name: _clickhouse_column_type(df[name]) for name in df.columns}
+    cols_def = ", ".join(f"`{name}` {t}" for name, t in col_types.items())
+    order_by = target.get("order_by")
+    if isinstance(order_by, list):
+        order_by = f"({', '.join(f'`{c}`' for c in order_by)})"
+    order_by = order_by or _clickhouse_order_by(df, col_types)
+    partition = f" PARTITION BY {target['partition_by']}" if target.get("partition_by") else ""
+    return f"CREATE TABLE {table} ({cols_def}) ENGINE = MergeTree(){partition} ORDER BY {order_by}"
+
+def _operator_percent(index: int, count: int) -> int:
+    # Reading takes 0-10%, operators share 10-80%, writing 85-100%
+    return 10 + 70 * index // max(count, 1)
+
 def run_pandas_job(config):
     print("Running in Pandas Mode.")
     
     # 1. Read Data
     source = config["source"]
+    report_progress(0, "read", source=source["type"])
     df = None
+    arrow = _arrow_transport(config)
+    read_kwargs = {"dtype_backend": "pyarrow"} if arrow else {}
     
     try:
         if source["type"] == "csv":
-            df = pd.read_csv(source["path"])
+            if arrow:
+                read_kwargs["engine"] = "pyarrow"
+            df = pd.read_csv(source["path"], **read_kwargs)
         elif source["type"] == "parquet":
-            df = pd.read_parquet(source["path"])
+            df = pd.read_parquet(source["path"], **read_kwargs)
         elif source["type"] == "mysql":
              # Use source_connection if available
              src_conf = config.get("source_connection")
@@ -95,7 +168,7 @@ def run_pandas_job(config):
                  
              query = source.get("query", f"SELECT * FROM {source.get('table')}")
              engine = create_engine(url)
-             df = pd.read_sql(query, engine)
+             df = pd.read_sql(query, engine, **read_kwargs)
         elif source["type"] == "clickhouse":
              from clickhouse_driver import Client
              
@@ -116,10 +189,18 @@ def run_pandas_job(config):
                  password = sys_ck.get('password')
                  database = 'default'
 
-             client = Client(host=host, port=port, user=user, password=password, database=database)
              query = source.get("query", f"SELECT * FROM {source.get('table')}")
-             data, columns = client.execute(query, with_column_types=True)
-             df = pd.DataFrame(data, columns=[c[0] for c in columns])
+             if arrow:
+                 from backend.app.services.arrow_transport import read_clickhouse_arrow
+                 http_port = (src_conf or sys_ck).get('http_port', 8123)
+                 df = read_clickhouse_arrow(
+                     {"host": host, "http_port": http_port, "user": user, "password": password, "database": database},
+                     query,
+                 )
+             else:
+                 client = Client(host=host, port=port, user=user, password=password, database=database)
+                 data, columns = client.execute(query, with_column_types=True)
+                 df = pd.DataFrame(data, columns=[c[0] for c in columns])
         else:
             raise ValueError(f"Unsupported source type: {source['type']}")
     except Exception as e:
@@ -127,12 +208,14 @@ def run_pandas_job(config):
          raise
 
     print(f"Initial rows: {len(df)}")
+    report_progress(10, "read_end", rows=len(df))
 
     # 2. Apply Operators
     operators = config.get("operators", [])
-    for op in operators:
+    for i, op in enumerate(operators):
         op_type = op["type"]
         print(f"Applying {op_type}...")
+        report_progress(_operator_percent(i, len(operators)), "operator", operator=op_type, index=i)
         
         if op_type == "dedup":
             cols = op.get("columns")
@@ -189,7 +272,10 @@ def run_pandas_job(config):
             mapping = op.get("mapping", {})
             df = df.rename(columns=mapping)
 
+        report_progress(_operator_percent(i + 1, len(operators)), "operator_end", operator=op_type, index=i, rows=len(df))
+
     print(f"Final rows: {len(df)}")
+    report_progress(85, "write", rows=len(df))
     
     # 3. Write Data
     target = config["target"]
@@ -256,15 +342,8 @@ def run_pandas_job(config):
              exists = client.execute(f"EXISTS TABLE {table}")[0][0]
              
              if not exists:
-                 # Infer schema
-                 cols_def = []
-                 for name, dtype in df.dtypes.items():
-                     if "int" in str(dtype): ch_type = "Int64"
-                     elif "float" in str(dtype): ch_type = "Float64"
-                     else: ch_type = "String"
-                     cols_def.append(f"`{name}` {ch_type}")
-                 
-                 create_sql = f"CREATE TABLE {table} ({', '.join(cols_def)}) ENGINE = MergeTree() ORDER BY tuple()"
+                 create_sql = clickhouse_create_table(table, df, target)
+                 print(f"Creating ClickHouse table: {create_sql}")
                  client.execute(create_sql)
              
              # Insert
@@ -274,7 +353,14 @@ def run_pandas_job(config):
              # Convert object columns to string to avoid potential issues
              # or rely on driver conversion.
              
-             client.insert_dataframe(f"INSERT INTO {table} VALUES", df)
+             if arrow:
+                 from backend.app.services.arrow_transport import insert_clickhouse_arrow
+                 insert_clickhouse_arrow(
+                     {"host": host, "http_port": ck_conf.get('http_port', 8123), "user": user, "password": password},
+                     table, df,
+                 )
+             else:
+                 client.insert_dataframe(f"INSERT INTO {table} VALUES", df)
              print(f"Written to ClickHouse table {table}")
              
              # Register
@@ -297,18 +383,28 @@ def run_pandas_job(config):
         print(f"Written to {output_file}")
         # Local file registration could be added if we tracked file assets by name
 
-def run_job(config_path: str):
-    with open(config_path, 'r') as f:
-        config = json.load(f)
+    report_progress(100, "done", rows=len(df))
+
+def run_job(config, spark=None):
+    """
+    Run a preprocess job. config is the job config dict or the path of its JSON file.
+    A given `spark` session (the job daemon's) is used as is and left running.
+    """
+    if isinstance(config, str):
+        with open(config, 'r') as f:
+            config = json.load(f)
+    owns_session = spark is None
     
     try:
         if not SPARK_AVAILABLE:
             raise Exception("PySpark module not found")
             
-        spark = get_spark_session(config.get("job_name", "PreprocessJob"))
+        if owns_session:
+            spark = get_spark_session(config.get("job_name", "PreprocessJob"))
         
         # 1. Read Data
         source = config["source"]
+        report_progress(0, "read", source=source["type"], engine="spark")
         df = None
         if source["type"] == "csv":
             df = spark.read.option("header", "true").csv(source["path"])
@@ -359,9 +455,13 @@ def run_job(config_path: str):
                 .load()
         
         # 2. Apply Operators
+        # Spark operators are lazy, so these only mark the plan being built; rows are
+        # counted once, before the write
+        report_progress(10, "read_end")
         operators = config.get("operators", [])
-        for op in operators:
+        for i, op in enumerate(operators):
             op_type = op["type"]
+            report_progress(_operator_percent(i, len(operators)), "operator", operator=op_type, index=i)
             if op_type == "dedup":
                 df = dedup(df, op.get("columns"))
             elif op_type == "filter":
@@ -389,6 +489,7 @@ def run_job(config_path: str):
             target_type = "jdbc"
         
         row_count = df.count()
+        report_progress(85, "write", rows=row_count)
         
         if target_type == "jdbc" or target_type == "mysql" or target_type == "clickhouse":
              url = target.get("url")
@@ -462,7 +563,9 @@ def run_job(config_path: str):
              else:
                 df.write.mode(write_mode).option("header", "true").csv(target["path"])
         
-        spark.stop()
+        report_progress(100, "done", rows=row_count)
+        if owns_session:
+            spark.stop()
         
     except Exception as e:
         print(f"Spark execution failed/unavailable: {e}")
@@ -0,0 +1,42 @@
+import json
+from collections import deque
+
+# Progress line protocol between preprocess jobs and their runners. A job prints
+#   PROGRESS {"percent": 45, "stage": "operator_end", "operator": "dedup", "rows": 1200}
+# on stdout; runners turn these lines into DataTask.progress instead of logging them.
+PREFIX = "PROGRESS "
+
+def report_progress(percent, stage: str, **fields):
+    print(PREFIX + json.dumps(dict(fields, percent=int(percent), stage=stage), default=str), flush=True)
+
+def parse_progress(line: str):
+    """The progress dict of a PROGRESS line, None for any other line."""
+    if not line.startswith(PREFIX):
+        return None
+    try:
+        return json.loads(line[len(PREFIX):])
+    except ValueError:
+        return None
+
+
+class BoundedLog:
+    """
+    The last `max_lines` lines of a job's output, each cut to `max_line_chars`, so chatty
+    jobs cannot grow the runner's memory without limit.
+    """
+
+    def __init__(self, max_lines: int = 2000, max_line_chars: int = 4000):
+        self.lines = deque(maxlen=max(int(max_lines), 1))
+        self.max_line_chars = max_line_chars
+        self.dropped = 0
+
+    def append(self, line: str):
+        if len(self.lines) == self.lines.maxlen:
+            self.dropped += 1
+        if len(line) > self.max_line_chars:
+            line = line[:self.max_line_chars] + "...<truncated>"
+        self.lines.append(line)
+
+    def text(self) -> str:
+        head = [f"...<{self.dropped} earlier lines dropped>"] if self.dropped else []
+        return "\n".join(head + list(self.lines))
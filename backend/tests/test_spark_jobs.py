@@ -0,0 +1,160 @@
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+
+class TestSparkJobDaemon(unittest.TestCase):
+    """Jobs submitted over the daemon socket (PySpark absent, so they run on pandas)."""
+
+    def setUp(self):
+        from types import SimpleNamespace
+        from backend.spark_jobs.job_daemon import JobDaemon
+        import backend.app.services.spark_service as spark_service
+
+        self.daemon = JobDaemon(("127.0.0.1", 0), b"test-key", max_jobs=2, log_lines=50)
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+
+        self.spark_service = spark_service
+        self._orig = spark_service.settings
+        host, port = self.daemon.address
+        spark_service.settings = SimpleNamespace(
+            SPARK_DAEMON_HOST=host, SPARK_DAEMON_PORT=port, SPARK_DAEMON_AUTHKEY="test-key",
+            SPARK_DAEMON_START_TIMEOUT=0,
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.spark_service.settings = self._orig
+        self.daemon.close()
+        self.tmp.cleanup()
+
+    def _config(self, source_path):
+        return {
+            "source": {"type": "csv", "path": source_path},
+            "target": {"type": "csv", "path": str(Path(self.tmp.name) / "out"), "mode": "overwrite"},
+            "operators": [{"type": "dedup"}],
+        }
+
+    def test_daemon_runs_jobs_and_returns_their_output(self):
+        import pandas as pd
+
+        source_csv = Path(self.tmp.name) / "input.csv"
+        pd.DataFrame({"a": [1, 1, 2]}).to_csv(source_csv, index=False)
+
+        progress = []
+        ok, output = self.spark_service._run_in_daemon(self._config(str(source_csv)), "task-1", progress.append)
+        self.assertTrue(ok)
+        self.assertIn("Written to", output)
+        self.assertNotIn("PROGRESS", output)
+        self.assertEqual([p["stage"] for p in progress], ["read", "read_end", "operator", "operator_end", "write", "done"])
+        self.assertEqual((progress[3]["operator"], progress[3]["rows"], progress[-1]["percent"]), ("dedup", 2, 100))
+        self.assertEqual(len(pd.read_csv(Path(self.tmp.name) / "out" / "part-00000.csv")), 2)
+
+        # A failing job reports its own error; the daemon keeps serving
+        ok, output = self.spark_service._run_in_daemon(self._config(str(Path(self.tmp.name) / "missing.csv")), "task-2")
+        self.assertFalse(ok)
+        self.assertIn("missing.csv", output)
+        self.assertNotIn("Written to", output)
+
+    def test_unreachable_daemon_falls_back_to_subprocess(self):
+        self.daemon.close()
+        orig = self.spark_service._start_daemon
+        self.spark_service._start_daemon = lambda: None
+        try:
+            self.assertIsNone(self.spark_service._run_in_daemon({}, "task-1"))
+        finally:
+            self.spark_service._start_daemon = orig
+
+    def test_closed_daemon_stops_listening(self):
+        from multiprocessing.connection import Client
+
+        # A client with the wrong key is turned away without stopping the daemon
+        with self.assertRaises(Exception):
+            Client(self.daemon.address, authkey=b"wrong-key")
+        with Client(self.daemon.address, authkey=b"test-key") as conn:
+            conn.send({"op": "ping"})
+            self.assertTrue(conn.recv()["ok"])
+
+        self.daemon.close()
+        with self.assertRaises(ConnectionRefusedError):
+            Client(self.daemon.address, authkey=b"test-key")
+
+    def test_authkey_is_generated_once_and_private(self):
+        from types import SimpleNamespace
+
+        key_file = os.path.join(self.tmp.name, "keys", "daemon.key")
+        self.spark_service.settings = SimpleNamespace(SPARK_DAEMON_AUTHKEY="", SPARK_DAEMON_AUTHKEY_FILE=key_file)
+        key = self.spark_service._daemon_authkey()
+        self.assertGreaterEqual(len(key), 32)
+        self.assertEqual(os.stat(key_file).st_mode & 0o777, 0o600)
+        self.assertEqual(self.spark_service._daemon_authkey(), key)
+
+        # A key file others can read is not trusted, and no key means no daemon
+        os.chmod(key_file, 0o644)
+        self.assertIsNone(self.spark_service._daemon_authkey())
+        self.assertIsNone(self.spark_service._connect_daemon())
+
+
+class TestJobOutputStreaming(unittest.TestCase):
+    def setUp(self):
+        from types import SimpleNamespace
+        from sqlmodel import SQLModel, create_engine
+        import backend.app.services.spark_service as spark_service
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'meta.db')}")
+        SQLModel.metadata.create_all(self.engine)
+        self.spark_service = spark_service
+        self._orig = (spark_service.settings, spark_service.engine)
+        spark_service.settings = SimpleNamespace(JOB_LOG_MAX_LINES=5)
+        spark_service.engine = self.engine
+
+    def tearDown(self):
+        self.spark_service.settings, self.spark_service.engine = self._orig
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_subprocess_output_is_streamed_into_bounded_log_and_progress(self):
+        import sys
+        from sqlmodel import Session
+        from backend.app.models.task import DataTask
+
+        with Session(self.engine) as session:
+            task = DataTask(name="p", task_type="preprocess", config="{}")
+            session.add(task)
+            session.commit()
+            task_id = task.id
+
+        script = (
+            "from backend.spark_jobs.progress import report_progress\n"
+            "for i in range(100): print('line', i)\n"
+            "report_progress(40, 'operator', operator='dedup')\n"
+            "print('x' * 10000)\n"
+            "report_progress(100, 'done')\n"
+            "raise SystemExit('boom')\n"
+        )
+        seen = []
+        update = self.spark_service._progress_updater(task_id)
+
+        def on_progress(progress):
+            seen.append(progress["percent"])
+            update(progress)
+            with Session(self.engine) as session:
+                seen.append(session.get(DataTask, task_id).progress)
+
+        ok, output = self.spark_service._run_subprocess(
+            [sys.executable, "-c", script], self.spark_service._job_env(), on_progress,
+        )
+        self.assertFalse(ok)
+        self.assertEqual(seen, [40, 40, 100, 99])
+        lines = output.split("\n")
+        self.assertEqual(lines[0], "...<97 earlier lines dropped>")
+        self.assertEqual(lines[1:4], ["line 97", "line 98", "line 99"])
+        self.assertTrue(lines[4].endswith("...<truncated>"))
+        self.assertEqual(lines[-1], "boom")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,1232 @@
+import os
+import tempfile
+import unittest
+
+
+class TestKeysetRangeSync(unittest.TestCase):
+    def setUp(self):
+        import pandas as pd
+        from sqlalchemy import create_engine
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'source.db')}")
+        self.target_engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'target.db')}")
+
+        # Sparse keys so ranges are not evenly filled
+        ids = [i * 3 for i in range(1, 1001)]
+        pd.DataFrame({"id": ids, "name": [f"n{i}" for i in ids]}).to_sql("src", self.source_engine, index=False)
+
+    def tearDown(self):
+        self.source_engine.dispose()
+        self.target_engine.dispose()
+        self.tmp.cleanup()
+
+    def test_plan_key_ranges_covers_whole_key_space(self):
+        from backend.app.services.sync_service import _plan_key_ranges
+
+        ranges = _plan_key_ranges(self.source_engine, "src", "id", 4)
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[0][0], 2)
+        self.assertEqual(ranges[-1][1], 3000)
+        for (_, prev_hi), (lo, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(prev_hi, lo)
+
+    def test_copy_key_ranges_copies_every_row_once(self):
+        import pandas as pd
+        from backend.app.services.sync_service import _copy_key_ranges, _plan_key_ranges
+        from backend.app.services.sync_writers import create_writer
+
+        pd.read_sql("SELECT * FROM src LIMIT 0", self.source_engine).to_sql("tgt", self.target_engine, index=False)
+        ranges = _plan_key_ranges(self.source_engine, "src", "id", 4)
+        progress = []
+        copied = _copy_key_ranges(
+            self.source_engine,
+            lambda: create_writer(self.target_engine, "tgt", "append", {}),
+            "src", "id",
+            ranges, chunk_size=70, parallelism=4, on_progress=progress.append,
+        )
+
+        self.assertEqual(copied, 1000)
+        self.assertEqual(progress[-1], 1000)
+        df = pd.read_sql("SELECT id FROM tgt", self.target_engine)
+        self.assertEqual(len(df), 1000)
+        self.assertEqual(df["id"].nunique(), 1000)
+
+    def test_bucket_checksums_localize_mismatched_key_ranges(self):
+        import zlib
+        from sqlalchemy import event, text
+        from backend.app.services.sync_service import _bucket_range, _compare_bucket_checksums, _plan_buckets
+
+        # MySQL's CRC32/CONCAT_WS for SQLite
+        for eng in (self.source_engine, self.target_engine):
+            @event.listens_for(eng, "connect")
+            def _register(dbapi_conn, _record):
+                dbapi_conn.create_function("CRC32", 1, lambda v: zlib.crc32(str(v).encode()))
+                dbapi_conn.create_function(
+                    "CONCAT_WS", -1, lambda sep, *vals: sep.join(str(v) for v in vals if v is not None)
+                )
+            eng.dispose()
+
+        with self.source_engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, name FROM src")).fetchall()
+        with self.target_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE tgt (id INTEGER, name TEXT)"))
+            conn.execute(text("INSERT INTO tgt VALUES (:id, :name)"), [{"id": r[0], "name": r[1]} for r in rows])
+            conn.execute(text("UPDATE tgt SET name = 'changed' WHERE id = 300"))
+            conn.execute(text("DELETE FROM tgt WHERE id = 2700"))
+
+        lo, width = _plan_buckets(self.source_engine, "src", "id", 10)
+        self.assertEqual((lo, width), (3, 300))
+        mismatches = _compare_bucket_checksums(
+            self.source_engine, self.target_engine, "src", "tgt", "id", ["id", "name"], lo, width
+        )
+        self.assertEqual(mismatches, [_bucket_range(lo, width, 0), _bucket_range(lo, width, 8)])
+        self.assertEqual(mismatches[0], (2, 302))
+
+        # Re-checking just the mismatched ranges after a fix comes back clean
+        with self.target_engine.begin() as conn:
+            conn.execute(text("UPDATE tgt SET name = 'n300' WHERE id = 300"))
+            conn.execute(text("INSERT INTO tgt VALUES (2700, 'n2700')"))
+        self.assertEqual(_compare_bucket_checksums(
+            self.source_engine, self.target_engine, "src", "tgt", "id", ["id", "name"], lo, width, ranges=mismatches
+        ), [])
+
+    def test_sample_verify_is_deterministic_and_finds_differences(self):
+        import pandas as pd
+        from sqlalchemy import text
+        from backend.app.services.sync_service import _sample_size, _sample_verify
+
+        self.assertEqual(_sample_size(0.99, 0.001), 4603)
+
+        pd.read_sql("SELECT * FROM src", self.source_engine).to_sql("tgt", self.target_engine, index=False)
+        sampled, differing = _sample_verify(self.source_engine, self.target_engine, "src", "tgt", "id", 200, seed=7)
+        self.assertGreater(sampled, 150)
+        self.assertEqual(differing, [])
+
+        with self.target_engine.begin() as conn:
+            conn.execute(text("UPDATE tgt SET name = 'changed' WHERE id % 2 = 0"))
+        first = _sample_verify(self.source_engine, self.target_engine, "src", "tgt", "id", 200, seed=7)
+        again = _sample_verify(self.source_engine, self.target_engine, "src", "tgt", "id", 200, seed=7)
+        self.assertEqual(first, again)
+        self.assertGreater(len(first[1]), 0)
+        self.assertTrue(all(k % 2 == 0 for k in first[1]))
+
+    def test_stream_mysql_batches_yields_bounded_chunks(self):
+        from backend.app.services.sync_service import _stream_mysql_batches
+
+        sizes = [len(chunk) for chunk in _stream_mysql_batches(self.source_engine, "SELECT * FROM src", 300)]
+        self.assertEqual(sizes, [300, 300, 300, 100])
+
+
+class TestSyncPipeline(unittest.TestCase):
+    def test_pipelined_preserves_order_and_bounds_read_ahead(self):
+        import time
+        from backend.app.services.sync_service import _pipelined
+
+        produced = []
+
+        def source():
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        consumed = []
+        for item in _pipelined(source(), depth=2):
+            if item == 0:
+                # Reader can only be the queue depth plus the item it is blocked on ahead
+                time.sleep(0.2)
+                self.assertLessEqual(len(produced), 4)
+            consumed.append(item)
+        self.assertEqual(consumed, list(range(10)))
+
+    def test_pipelined_reraises_reader_errors(self):
+        from backend.app.services.sync_service import _pipelined
+
+        def source():
+            yield 1
+            raise ConnectionError("lost source")
+
+        with self.assertRaises(ConnectionError):
+            list(_pipelined(source()))
+
+    def test_pipelined_close_stops_reader(self):
+        from contextlib import closing
+        from backend.app.services.sync_service import _pipelined
+
+        closed = []
+
+        def source():
+            try:
+                for i in range(1000):
+                    yield i
+            finally:
+                closed.append(True)
+
+        with closing(_pipelined(source(), depth=1)) as items:
+            self.assertEqual(next(items), 0)
+        self.assertEqual(closed, [True])
+
+    def test_write_batches_uses_all_writers(self):
+        import threading
+        from backend.app.services.sync_service import _write_batches
+
+        threads = set()
+        written = []
+        lock = threading.Lock()
+
+        def write(batch):
+            with lock:
+                threads.add(threading.get_ident())
+            written.append(batch)
+
+        seen = []
+        _write_batches(range(50), write, writers=3, on_written=seen.append)
+        self.assertEqual(sorted(written), list(range(50)))
+        self.assertEqual(sorted(seen), list(range(50)))
+        self.assertNotIn(threading.get_ident(), threads)
+
+
+class TestSyncThrottle(unittest.TestCase):
+    def test_chunk_sizer_follows_row_width_and_latency(self):
+        from backend.app.services.sync_throttle import ChunkSizer
+
+        narrow = ChunkSizer(initial=5000, target_bytes=8 * 1024 * 1024, target_seconds=1.0)
+        for _ in range(5):
+            narrow.observe(narrow.size, narrow.size * 50, 0.05)
+        self.assertGreater(narrow.size, 5000)
+
+        wide = ChunkSizer(initial=5000, target_bytes=8 * 1024 * 1024)
+        wide.observe(5000, 5000 * 64 * 1024, 0.5)  # 64 KiB blobs
+        self.assertEqual(wide.size, 500)
+
+        slow = ChunkSizer(initial=5000)
+        slow.observe(5000, 5000 * 50, 5.0)
+        self.assertLess(slow.size, 5000)
+
+    def test_throttle_sleeps_to_respect_ceilings(self):
+        from datetime import datetime
+        from backend.app.services.sync_throttle import Throttle
+
+        now = [0.0]
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        throttle = Throttle(
+            [{"rows_per_sec": 1000, "hours": "08:00-20:00"}],
+            clock=lambda: now[0], sleep=sleep, now=lambda: datetime(2024, 1, 1, 12, 0),
+        )
+        throttle.acquire(1000)
+        self.assertEqual(slept, [])
+        throttle.acquire(2000)
+        self.assertAlmostEqual(slept[-1], 2.0)
+
+        # Outside the business-hours window nothing is limited
+        night = Throttle(
+            [{"rows_per_sec": 1000, "hours": "08:00-20:00"}],
+            clock=lambda: now[0], sleep=sleep, now=lambda: datetime(2024, 1, 1, 23, 0),
+        )
+        slept.clear()
+        night.acquire(100000)
+        self.assertEqual(slept, [])
+
+    def test_get_throttle_is_shared_per_datasource(self):
+        from backend.app.services.sync_throttle import get_throttle
+
+        conn_info = {"throttle": {"bytes_per_sec": 1024}}
+        self.assertIs(get_throttle(9001, conn_info), get_throttle(9001, conn_info))
+        self.assertIsNone(get_throttle(9002, {}))
+        conn_info = {"throttle": [{"bytes_per_sec": 2048}]}
+        self.assertEqual(get_throttle(9001, conn_info).limits(), {"bytes_per_sec": 2048.0})
+
+    def test_stream_batches_resize_between_fetches(self):
+        import pandas as pd
+        from sqlalchemy import create_engine
+        from backend.app.services.sync_service import _stream_mysql_batches
+        from backend.app.services.sync_throttle import ChunkSizer
+
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'src.db')}")
+            pd.DataFrame({"id": range(100)}).to_sql("t", engine, index=False)
+            sizer = ChunkSizer(initial=10, min_rows=10, max_rows=40)
+            sizes = [len(c) for c in _stream_mysql_batches(engine, "SELECT * FROM t", 10, sizer=sizer)]
+            engine.dispose()
+
+        self.assertEqual(sum(sizes), 100)
+        self.assertEqual(sizes[:3], [10, 20, 40])
+
+
+class FakeClickHouseClient:
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+        self.calls = []
+
+    def execute_iter(self, query, params=None, with_column_types=False, settings=None):
+        self.calls.append((query, params, settings))
+        if with_column_types:
+            yield self.columns
+        yield from self.rows
+
+
+class TestRunSyncTaskMySQL(unittest.TestCase):
+    """Runs run_sync_task end to end with SQLite files standing in for the MySQL source and system DB."""
+
+    def setUp(self):
+        import pandas as pd
+        from types import SimpleNamespace
+        from sqlalchemy import create_engine, text
+        from sqlalchemy.pool import StaticPool
+        from sqlmodel import SQLModel
+        import backend.app.services.sync_service as sync_service
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_url = f"sqlite:///{os.path.join(self.tmp.name, 'source.db')}"
+        self.target_url = f"sqlite:///{os.path.join(self.tmp.name, 'target.db')}"
+        self.source_engine = create_engine(self.source_url)
+        self.target_engine = create_engine(self.target_url)
+        with self.source_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE events (id INTEGER PRIMARY KEY, ts INTEGER)"))
+        pd.DataFrame({"id": [1, 2, 3], "ts": [10, 20, 30]}).to_sql("events", self.source_engine, index=False, if_exists="append")
+
+        self.meta_engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool, echo=False
+        )
+        SQLModel.metadata.create_all(self.meta_engine)
+
+        self.sync_service = sync_service
+        self._orig = (sync_service.engine, sync_service._mysql_url, sync_service.settings)
+        sync_service.engine = self.meta_engine
+        sync_service._mysql_url = lambda _conn_info: self.source_url
+        sync_service.settings = SimpleNamespace(SYSTEM_DB_URL=self.target_url, SYNC_MAX_WORKERS=4)
+
+    def tearDown(self):
+        self.sync_service.engine, self.sync_service._mysql_url, self.sync_service.settings = self._orig
+        self.source_engine.dispose()
+        self.target_engine.dispose()
+        self.tmp.cleanup()
+
+    def _create_task(self, source_conf, target_conf):
+        import json
+        from sqlmodel import Session
+        from backend.app.models.datasource import DataSource
+        from backend.app.models.task import DataTask
+
+        with Session(self.meta_engine) as session:
+            ds = DataSource(name="src", type="mysql", connection_info=json.dumps({"host": "h"}))
+            session.add(ds)
+            session.commit()
+            task = DataTask(
+                name="sync1",
+                task_type="sync",
+                config=json.dumps({"source_id": ds.id, "source": source_conf, "target": target_conf}),
+            )
+            session.add(task)
+            session.commit()
+            return task.id
+
+    def _get(self, model, **filters):
+        from sqlmodel import Session, select
+
+        with Session(self.meta_engine) as session:
+            query = select(model)
+            for name, value in filters.items():
+                query = query.where(getattr(model, name) == value)
+            return session.exec(query).all()
+
+    def test_parallel_full_sync_copies_all_rows(self):
+        import pandas as pd
+        from backend.app.models.task import DataTask
+
+        task_id = self._create_task(
+            {"table": "events", "parallelism": 2, "split_column": "id", "chunk_size": 1},
+            {"table": "events_copy", "mode": "append"},
+        )
+        self.sync_service.run_sync_task(task_id)
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+
+    def test_non_unique_split_column_falls_back_to_single_stream(self):
+        import pandas as pd
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+
+        # Keyset pages ending inside a run of equal user_id values would skip the rest of the run
+        pd.DataFrame({"id": range(100), "user_id": [i // 10 for i in range(100)]}).to_sql("visits", self.source_engine, index=False)
+        for mode in ("append", "overwrite"):
+            with self.subTest(mode=mode):
+                task_id = self._create_task(
+                    {"table": "visits", "split_column": "user_id", "parallelism": 2, "chunk_size": 7},
+                    {"table": f"visits_{mode}", "mode": mode},
+                )
+                self.sync_service.run_sync_task(task_id)
+
+                self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+                df = pd.read_sql(f"SELECT id FROM visits_{mode} ORDER BY id", self.target_engine)
+                self.assertEqual(df["id"].tolist(), list(range(100)))
+                # Nor is it used as a resume key
+                self.assertFalse(any(s.checkpoint for s in self._get(SyncState, task_id=task_id)))
+
+    def test_incremental_mode_only_copies_rows_past_watermark(self):
+        import pandas as pd
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.synced_table import SyncedTable
+        from backend.app.models.task import DataTask
+
+        task_id = self._create_task(
+            {"table": "events", "watermark_column": "ts", "chunk_size": 2},
+            {"table": "events_copy", "mode": "incremental"},
+        )
+
+        self.sync_service.run_sync_task(task_id)
+        pd.DataFrame({"id": [4, 5], "ts": [40, 50]}).to_sql("events", self.source_engine, index=False, if_exists="append")
+        self.sync_service.run_sync_task(task_id)
+
+        task = self._get(DataTask, id=task_id)[0]
+        self.assertEqual(task.status, "success")
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3, 4, 5])
+        # The primary key breaks ties between rows sharing a watermark value
+        self.assertEqual(self._get(SyncState, task_id=task_id)[0].watermark, "[50, 5]")
+        self.assertEqual(self._get(SyncedTable, table_name="events_copy")[0].row_count, 5)
+
+    def test_incremental_resume_keeps_rows_sharing_the_watermark(self):
+        import pandas as pd
+        from sqlalchemy import text
+        from backend.app.models.task import DataTask
+
+        with self.source_engine.begin() as conn:
+            conn.execute(text("UPDATE events SET ts = 10"))
+            conn.execute(text("INSERT INTO events (id, ts) VALUES (4, 20)"))
+        pd.read_sql("SELECT * FROM events", self.source_engine).to_sql("events_nokey", self.source_engine, index=False)
+        create_writer = self.sync_service.create_writer
+
+        def flaky_writer(*args, **kwargs):
+            writer = create_writer(*args, **kwargs)
+            write = writer.write
+
+            def fail_on_third(df):
+                if 3 in df["id"].tolist():
+                    raise ConnectionError("target went away")
+                write(df)
+            writer.write = fail_on_third
+            return writer
+
+        for table in ("events", "events_nokey"):
+            with self.subTest(table=table):
+                with self.target_engine.begin() as conn:
+                    conn.execute(text("DROP TABLE IF EXISTS events_copy"))
+                task_id = self._create_task(
+                    {"table": table, "watermark_column": "ts", "chunk_size": 2},
+                    {"table": "events_copy", "mode": "incremental"},
+                )
+                self.sync_service.create_writer = flaky_writer
+                try:
+                    self.sync_service.run_sync_task(task_id)
+                finally:
+                    self.sync_service.create_writer = create_writer
+                self.assertEqual(self._get(DataTask, id=task_id)[0].status, "failed")
+
+                self.sync_service.run_sync_task(task_id)
+                self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+                ids = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)["id"].tolist()
+                if table == "events":
+                    # (watermark, id) cursor resumes exactly after row 2
+                    self.assertEqual(ids, [1, 2, 3, 4])
+                else:
+                    # Without a key the watermark stays below the value shared by rows 1-3
+                    self.assertEqual(sorted(set(ids)), [1, 2, 3, 4])
+
+    def test_incremental_resume_on_unique_watermark_against_keyed_target(self):
+        import pandas as pd
+        from sqlalchemy import text
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+
+        # The target carries the source's primary key, so re-reading a committed row fails
+        with self.target_engine.begin() as conn:
+            conn.execute(text("CREATE TABLE events_copy (id INTEGER PRIMARY KEY, ts INTEGER)"))
+        task_id = self._create_task(
+            {"table": "events", "watermark_column": "id", "chunk_size": 2},
+            {"table": "events_copy", "mode": "incremental"},
+        )
+        create_writer = self.sync_service.create_writer
+
+        def flaky_writer(*args, **kwargs):
+            writer = create_writer(*args, **kwargs)
+            write = writer.write
+
+            def fail_on_third(df):
+                if 3 in df["id"].tolist():
+                    raise ConnectionError("target went away")
+                write(df)
+            writer.write = fail_on_third
+            return writer
+
+        self.sync_service.create_writer = flaky_writer
+        try:
+            self.sync_service.run_sync_task(task_id)
+        finally:
+            self.sync_service.create_writer = create_writer
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "failed")
+        # A unique watermark has no ties, so the last committed value is saved as is
+        self.assertEqual(self._get(SyncState, task_id=task_id)[0].watermark, "2")
+
+        self.sync_service.run_sync_task(task_id)
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+        self.assertEqual(self._get(SyncState, task_id=task_id)[0].watermark, "3")
+
+    def test_merge_mode_upserts_changed_rows_by_key(self):
+        import pandas as pd
+        from sqlalchemy import text
+        from backend.app.models.synced_table import SyncedTable
+        from backend.app.models.task import DataTask
+
+        task_id = self._create_task(
+            {"table": "events", "watermark_column": "ts", "chunk_size": 2},
+            {"table": "events_copy", "mode": "merge", "merge_key": "id"},
+        )
+
+        self.sync_service.run_sync_task(task_id)
+        with self.source_engine.begin() as conn:
+            conn.execute(text("UPDATE events SET ts = 60 WHERE id = 2"))
+            conn.execute(text("INSERT INTO events (id, ts) VALUES (4, 70)"))
+        self.sync_service.run_sync_task(task_id)
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT id, ts FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df.values.tolist(), [[1, 10], [2, 60], [3, 30], [4, 70]])
+        # The registry counts rows in the target, not rows applied
+        self.assertEqual(self._get(SyncedTable, table_name="events_copy")[0].row_count, 4)
+
+    def test_failed_full_sync_resumes_from_checkpoint(self):
+        import json
+        import pandas as pd
+        from sqlalchemy import inspect
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.synced_table import SyncedTable
+        from backend.app.models.task import DataTask
+
+        task_id = self._create_task(
+            {"table": "events", "split_column": "id", "chunk_size": 1},
+            {"table": "events_copy", "mode": "overwrite"},
+        )
+        create_writer = self.sync_service.create_writer
+
+        def flaky_writer(*args, **kwargs):
+            writer = create_writer(*args, **kwargs)
+            write = writer.write
+
+            def fail_on_third(df):
+                if 3 in df["id"].tolist():
+                    raise ConnectionError("source went away")
+                write(df)
+            writer.write = fail_on_third
+            return writer
+
+        self.sync_service.create_writer = flaky_writer
+        try:
+            self.sync_service.run_sync_task(task_id)
+        finally:
+            self.sync_service.create_writer = create_writer
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "failed")
+        checkpoint = json.loads(self._get(SyncState, task_id=task_id)[0].checkpoint)
+        self.assertEqual((checkpoint["after"], checkpoint["rows"]), (2, 2))
+
+        # The live table is untouched until the shadow load completes
+        self.assertFalse(inspect(self.target_engine).has_table("events_copy"))
+
+        # A stray row committed past the checkpoint is removed before resuming
+        pd.DataFrame({"id": [3], "ts": [30]}).to_sql("events_copy__shadow", self.target_engine, index=False, if_exists="append")
+        self.sync_service.run_sync_task(task_id)
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+        self.assertIsNone(self._get(SyncState, task_id=task_id)[0].checkpoint)
+        self.assertEqual(self._get(SyncedTable, table_name="events_copy")[0].row_count, 3)
+
+    def test_checkpoint_for_missing_shadow_table_is_dropped(self):
+        import json
+        import pandas as pd
+        from sqlmodel import Session
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+
+        task_id = self._create_task(
+            {"table": "events", "split_column": "id", "chunk_size": 1},
+            {"table": "events_copy", "mode": "overwrite"},
+        )
+        # Left behind by a worker that died after swapping the shadow into place
+        with Session(self.meta_engine) as session:
+            session.add(SyncState(
+                task_id=task_id, table_name="events",
+                checkpoint=json.dumps({"key": "id", "mode": "overwrite", "after": 2, "rows": 2}),
+            ))
+            session.commit()
+        self.sync_service.run_sync_task(task_id)
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+        self.assertIsNone(self._get(SyncState, task_id=task_id)[0].checkpoint)
+
+    def test_failed_append_sync_keeps_existing_target_rows(self):
+        import pandas as pd
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+
+        pd.DataFrame({"id": [100, 200], "ts": [0, 0]}).to_sql("events_copy", self.target_engine, index=False)
+        task_id = self._create_task(
+            {"table": "events", "split_column": "id", "chunk_size": 1},
+            {"table": "events_copy", "mode": "append"},
+        )
+        create_writer = self.sync_service.create_writer
+
+        def flaky_writer(*args, **kwargs):
+            writer = create_writer(*args, **kwargs)
+            write = writer.write
+
+            def fail_on_third(df):
+                if 3 in df["id"].tolist():
+                    raise ConnectionError("source went away")
+                write(df)
+            writer.write = fail_on_third
+            return writer
+
+        self.sync_service.create_writer = flaky_writer
+        try:
+            self.sync_service.run_sync_task(task_id)
+        finally:
+            self.sync_service.create_writer = create_writer
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "failed")
+        # Appends are not checkpointed: resuming would delete rows this run did not write
+        self.assertFalse(any(s.checkpoint for s in self._get(SyncState, task_id=task_id)))
+
+        self.sync_service.run_sync_task(task_id)
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        # Rows 1 and 2 from the failed run stay (it is an append), rows that predate the task survive
+        self.assertEqual(sorted(set(df["id"].tolist())), [1, 2, 3, 100, 200])
+
+    def test_overwrite_swaps_shadow_table_into_place(self):
+        import pandas as pd
+        from sqlalchemy import inspect
+        from backend.app.models.task import DataTask
+
+        pd.DataFrame({"id": [99], "ts": [0]}).to_sql("events_copy", self.target_engine, index=False)
+        task_id = self._create_task({"table": "events", "chunk_size": 2}, {"table": "events_copy", "mode": "overwrite"})
+        self.sync_service.run_sync_task(task_id)
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT id FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3])
+        tables = inspect(self.target_engine).get_table_names()
+        self.assertNotIn("events_copy__shadow", tables)
+        self.assertNotIn("events_copy__old", tables)
+
+    def test_multi_table_sync_reports_per_table_status(self):
+        import pandas as pd
+        from backend.app.api.task import read_task_tables
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+        from sqlmodel import Session
+
+        from sqlalchemy import create_engine
+        from sqlmodel import SQLModel
+
+        # Tables sync on separate threads with their own sessions, which the shared
+        # in-memory connection cannot serve, so this test uses a file-backed metadata DB
+        self.meta_engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'meta.db')}")
+        SQLModel.metadata.create_all(self.meta_engine)
+        self.sync_service.engine = self.meta_engine
+
+        pd.DataFrame({"id": [1, 2]}).to_sql("orders", self.source_engine, index=False)
+        pd.DataFrame({"id": [1]}).to_sql("audit_log", self.source_engine, index=False)
+        task_id = self._create_task(
+            {"tables": ["ev*", "orders"], "table_parallelism": 2, "chunk_size": 2},
+            {"table_prefix": "copy_", "mode": "overwrite"},
+        )
+        self.sync_service.run_sync_task(task_id)
+
+        task = self._get(DataTask, id=task_id)[0]
+        self.assertEqual((task.status, task.progress), ("success", 100))
+        self.assertEqual(pd.read_sql("SELECT count(*) AS n FROM copy_events", self.target_engine)["n"][0], 3)
+        self.assertEqual(pd.read_sql("SELECT count(*) AS n FROM copy_orders", self.target_engine)["n"][0], 2)
+        states = {s.table_name: s for s in self._get(SyncState, task_id=task_id)}
+        self.assertEqual(sorted(states), ["events", "orders"])
+        self.assertEqual([(s.status, s.rows) for s in (states["events"], states["orders"])], [("success", 3), ("success", 2)])
+
+        with Session(self.meta_engine) as session:
+            listing = read_task_tables(task_id, session)
+        self.assertEqual([item["table_name"] for item in listing["items"]], ["events", "orders"])
+
+    def test_multi_table_sync_stops_when_the_worker_loses_the_task(self):
+        import pandas as pd
+        from sqlalchemy import create_engine
+        from sqlmodel import Session, SQLModel
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+        from backend.app.services import task_queue
+
+        self.meta_engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'meta.db')}")
+        SQLModel.metadata.create_all(self.meta_engine)
+        self.sync_service.engine = self.meta_engine
+
+        for name in ("t1", "t2", "t3"):
+            pd.DataFrame({"id": [1, 2]}).to_sql(name, self.source_engine, index=False)
+        task_id = self._create_task(
+            {"tables": ["t*"], "table_parallelism": 1, "chunk_size": 1},
+            {"table_prefix": "copy_", "mode": "append"},
+        )
+        with Session(self.meta_engine) as session:
+            task = session.get(DataTask, task_id)
+            task.worker_id = "w1"
+            session.add(task)
+            session.commit()
+
+        sync_table = self.sync_service._sync_table
+        started = []
+
+        def taken_over(session, task, tracker, datasource, config, source_table, target_table):
+            # Requeued after missed heartbeats and claimed by another worker mid-table
+            started.append(source_table)
+            with Session(self.meta_engine) as other:
+                row = other.get(DataTask, task_id)
+                row.worker_id = "w2"
+                other.add(row)
+                other.commit()
+            lost.set()  # what the worker's next heartbeat finds
+            return sync_table(session, task, tracker, datasource, config, source_table, target_table)
+
+        lost = task_queue.acquire_lease(task_id, "w1")
+        self.sync_service._sync_table = taken_over
+        try:
+            self.sync_service.run_sync_task(task_id)
+        finally:
+            self.sync_service._sync_table = sync_table
+            task_queue.release_lease(task_id)
+
+        # The remaining tables never start, and no table is marked failed for the new owner
+        self.assertEqual(started, ["t1"])
+        states = {s.table_name: s.status for s in self._get(SyncState, task_id=task_id)}
+        self.assertEqual(states, {"t1": "running", "t2": "pending", "t3": "pending"})
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "running")
+
+    def test_arrow_transport_falls_back_to_rows_for_mysql(self):
+        import pandas as pd
+        from backend.app.models.task import DataTask
+
+        # transport=arrow only applies to ClickHouse sources; MySQL syncs keep row batches
+        pd.DataFrame({"id": [4], "ts": [None]}).to_sql("events", self.source_engine, index=False, if_exists="append")
+        task_id = self._create_task(
+            {"table": "events", "split_column": "id", "parallelism": 2, "transport": "arrow", "chunk_size": 2},
+            {"table": "events_copy", "mode": "overwrite"},
+        )
+        self.sync_service.run_sync_task(task_id)
+
+        self.assertEqual(self._get(DataTask, id=task_id)[0].status, "success")
+        df = pd.read_sql("SELECT * FROM events_copy ORDER BY id", self.target_engine)
+        self.assertEqual(df["id"].tolist(), [1, 2, 3, 4])
+        self.assertTrue(pd.isna(df["ts"].iloc[-1]))
+
+
+class TestArrowTransport(unittest.TestCase):
+    def test_clickhouse_arrow_stream_round_trip(self):
+        import io
+        from unittest import mock
+        import pandas as pd
+        from backend.app.services import arrow_transport
+
+        if not arrow_transport.ARROW_AVAILABLE:
+            self.skipTest("pyarrow not installed")
+        posted = {}
+
+        def fake_post(url, params=None, auth=None, data=None, stream=False, timeout=None):
+            resp = mock.Mock(status_code=200)
+            if data is not None:
+                posted["url"], posted["query"], posted["body"] = url, params["query"], data
+            else:
+                resp.raw = io.BytesIO(posted["body"])
+            return resp
+
+        conn = {"host": "ck", "http_port": 8124, "user": "u", "password": "p"}
+        df = pd.DataFrame({"id": [1, 2], "name": ["a", None]})
+        with mock.patch("requests.post", fake_post):
+            arrow_transport.insert_clickhouse_arrow(conn, "t", df)
+            batches = list(arrow_transport.iter_clickhouse_arrow(conn, "SELECT * FROM t"))
+
+        self.assertEqual(posted["url"], "http://ck:8124/")
+        self.assertEqual(posted["query"], "INSERT INTO t FORMAT ArrowStream")
+        frame = arrow_transport.batch_to_frame(batches[0])
+        self.assertEqual(frame["id"].tolist(), [1, 2])
+        self.assertTrue(pd.isna(frame["name"].iloc[1]))
+
+
+class TestClickHouseSync(unittest.TestCase):
+    def test_swap_clickhouse_tables_falls_back_to_rename(self):
+        from backend.app.services.sync_service import _swap_clickhouse_tables
+
+        class Client:
+            def __init__(self):
+                self.queries = []
+
+            def execute(self, query, params=None):
+                self.queries.append(query)
+                if query.startswith("EXISTS"):
+                    return [(1,)]
+                if query.startswith("EXCHANGE"):
+                    raise Exception("EXCHANGE TABLES is supported only in Atomic databases")
+                return []
+
+        client = Client()
+        _swap_clickhouse_tables(client, "t__shadow", "t")
+        self.assertEqual(client.queries[1:], [
+            "EXCHANGE TABLES t__shadow AND t",
+            "DROP TABLE IF EXISTS t__old",
+            "RENAME TABLE t TO t__old, t__shadow TO t",
+            "DROP TABLE t__old",
+        ])
+
+    def test_clickhouse_target_keeps_source_sorting_and_partition_keys(self):
+        from backend.app.services.sync_service import _clickhouse_table_keys
+
+        class Client:
+            def execute(self, query, params=None):
+                self.params = params
+                return [("ReplacingMergeTree", "toYYYYMM(ts)", "site, ts, id", "site, ts")]
+
+        client = Client()
+        clauses = _clickhouse_table_keys(client, "analytics.events")
+        self.assertEqual(clauses, " PARTITION BY toYYYYMM(ts) ORDER BY (site, ts, id) PRIMARY KEY (site, ts)")
+        self.assertEqual(client.params, {"db": "analytics", "name": "events"})
+
+    def test_pandas_job_infers_clickhouse_types_and_order_by(self):
+        import pandas as pd
+        from backend.spark_jobs.preprocess_job import clickhouse_create_table
+
+        df = pd.DataFrame({
+            "id": [1, 2, 3, 4],
+            "city": ["a", "a", "b", "a"],
+            "note": ["w", "x", "y", None],
+            "ts": pd.to_datetime(["2024-01-01"] * 4),
+            "v": [1.0, None, 2.0, 3.0],
+        })
+        self.assertEqual(
+            clickhouse_create_table("t", df, {}),
+            "CREATE TABLE t (`id` Int64, `city` LowCardinality(String), `note` Nullable(String), "
+            "`ts` DateTime64(3), `v` Nullable(Float64)) ENGINE = MergeTree() ORDER BY (`city`, `ts`)",
+        )
+        self.assertTrue(clickhouse_create_table("t", df, {"order_by": ["id"], "partition_by": "toYYYYMM(ts)"})
+                        .endswith("PARTITION BY toYYYYMM(ts) ORDER BY (`id`)"))
+
+    def test_merge_target_is_replacing_merge_tree_on_merge_key(self):
+        from backend.app.services.sync_service import _ensure_clickhouse_target
+
+        class Client:
+            def __init__(self):
+                self.queries = []
+
+            def execute(self, query, params=None):
+                self.queries.append(query)
+                if query.startswith("EXISTS"):
+                    return [(0,)]
+                if query.startswith("DESCRIBE"):
+                    return [("id", "UInt64", ""), ("updated_at", "DateTime", "")]
+                if "system.tables" in query:
+                    return [("MergeTree", "", "updated_at", "updated_at")]
+                return []
+
+        source, target = Client(), Client()
+        _ensure_clickhouse_target(source, target, "events", "events_copy", "merge",
+                                  {"merge_key": "id", "version_column": "updated_at"})
+        self.assertEqual(target.queries[-1], (
+            "CREATE TABLE events_copy (`id` UInt64, `updated_at` DateTime) "
+            "ENGINE = ReplacingMergeTree(`updated_at`) ORDER BY (`id`)"
+        ))
+
+    def test_iter_clickhouse_batches_bounds_batch_size(self):
+        from backend.app.services.sync_service import _iter_clickhouse_batches
+
+        client = FakeClickHouseClient([("id", "UInt64"), ("v", "String")], [(i, str(i)) for i in range(25)])
+        batches = list(_iter_clickhouse_batches(client, "SELECT * FROM t", 10))
+
+        self.assertEqual([len(rows) for _, rows in batches], [10, 10, 5])
+        self.assertEqual(batches[0][0], ["id", "v"])
+        self.assertEqual(batches[-1][1][-1], (24, "24"))
+        self.assertEqual(client.calls[0][2]["max_block_size"], 10)
+
+    def test_remote_source_escapes_credentials(self):
+        from backend.app.services.sync_service import _clickhouse_remote_source
+
+        conn_info = {"host": "ck1", "port": 9000, "user": "u", "password": "p'w", "database": "db"}
+        self.assertEqual(
+            _clickhouse_remote_source(conn_info, "events"),
+            "remote('ck1:9000', 'db', 'events', 'u', 'p\\'w')",
+        )
+        conn_info["remote_address"] = "ck1.internal:9440"
+        self.assertTrue(_clickhouse_remote_source(conn_info, "other.events", secure=True).startswith(
+            "remoteSecure('ck1.internal:9440', 'other', 'events'"
+        ))
+
+    def test_content_hash_comparison_names_groups_and_columns(self):
+        from backend.app.services.sync_service import _compare_clickhouse_hashes
+
+        class Client:
+            def __init__(self, rows):
+                self.rows = rows
+                self.queries = []
+
+            def execute(self, query):
+                self.queries.append(query)
+                return self.rows
+
+        source = Client([(0, 10, 111, 222, 5, 6), (1, 10, 333, 444, 7, 8)])
+        target = Client([(0, 10, 111, 222, 5, 6), (1, 10, 335, 446, 7, 9), (2, 1, 1, 1, 1, 1)])
+
+        mismatches = _compare_clickhouse_hashes(source, target, "src", "tgt", ["id", "v"], "cityHash64(`id`) % 4")
+
+        self.assertEqual(mismatches, [(1, ["v"]), (2, ["*"])])
+        self.assertIn("groupBitXor(cityHash64(`id`, `v`))", source.queries[0])
+        self.assertIn("GROUP BY grp", target.queries[0])
+
+    def test_polling_copies_only_new_rows_per_poll(self):
+        from sqlalchemy import create_engine
+        from sqlalchemy.pool import StaticPool
+        from sqlmodel import Session, SQLModel
+        from unittest import mock
+        from backend.app.models.sync_state import SyncState
+        from backend.app.models.task import DataTask
+        from backend.app.services.sync_service import _poll_clickhouse_source
+
+        meta_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(meta_engine)
+
+        table = [(i,) for i in range(3)]
+
+        class Source(FakeClickHouseClient):
+            def execute(self, query, params=None):
+                wm = (params or {}).get("wm")
+                rows = [r for r in table if wm is None or r[0] > wm]
+                return [(len(rows), max((r[0] for r in rows), default=0))]
+
+            def execute_iter(self, query, params=None, with_column_types=False, settings=None):
+                self.rows = [r for r in table if params["wm"] < r[0] <= params["wm_hi"]]
+                return super().execute_iter(query, params, with_column_types, settings)
+
+        class Target:
+            inserted = []
+
+            def execute(self, query, rows):
+                self.inserted.extend(rows)
+
+        class Clock:
+            now = 0.0
+
+            def monotonic(self):
+                return self.now
+
+            def sleep(self, seconds):
+                self.now += seconds
+                table.append((len(table),))  # a new row lands between polls
+
+        with Session(meta_engine) as session:
+            task = DataTask(name="poll", task_type="sync", config="{}")
+            session.add(task)
+            session.commit()
+
+            with mock.patch("backend.app.services.sync_service.time", Clock()):
+                written = _poll_clickhouse_source(
+                    session, task, Source([("id", "UInt64")], []), Target(), "src", "tgt",
+                    {"watermark_column": "id"}, {"interval": 5, "duration": 10},
+                )
+
+            self.assertEqual(written, 2)
+            self.assertEqual(Target.inserted, [(3,), (4,)])
+            state = session.exec(SyncState.__table__.select()).first()
+            self.assertEqual(state.watermark, "4")
+            self.assertEqual(task.progress, 100)
+
+            # MergeTree read order is not insertion order, so there is no row-offset cursor
+            with self.assertRaisesRegex(Exception, "watermark_column"):
+                _poll_clickhouse_source(session, task, Source([("id", "UInt64")], []), Target(), "src", "tgt",
+                                        {}, {"interval": 5, "duration": 10})
+
+        meta_engine.dispose()
+
+
+
+class FakeS3:
+    """In-memory stand-in for the boto3 S3 client calls the MinIO sync uses."""
+
+    def __init__(self, buckets, page_size=2):
+        import threading
+
+        self.buckets = buckets
+        self.page_size = page_size
+        self.copies = []
+        self.lock = threading.Lock()
+
+    def get_paginator(self, name):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket):
+                keys = sorted(fake.buckets.get(Bucket, {}))
+                for i in range(0, len(keys), fake.page_size):
+                    yield {"Contents": [
+                        {"Key": k, "ETag": f'"{fake.buckets[Bucket][k][0]}"', "Size": fake.buckets[Bucket][k][1]}
+                        for k in keys[i:i + fake.page_size]
+                    ]}
+
+        return Paginator()
+
+    def copy_object(self, CopySource, Bucket, Key):
+        with self.lock:
+            self.copies.append(Key)
+            self.buckets.setdefault(Bucket, {})[Key] = self.buckets[CopySource["Bucket"]][Key]
+
+    def head_object(self, Bucket, Key):
+        etag, size = self.buckets[Bucket][Key][:2]
+        meta = self.buckets[Bucket][Key][2] if len(self.buckets[Bucket][Key]) > 2 else {}
+        return {"ETag": f'"{etag}"', "ContentLength": size, "Metadata": meta}
+
+    def create_multipart_upload(self, Bucket, Key, Metadata, **kwargs):
+        self.uploads = {"parts": [], "metadata": Metadata, "failed_once": set()}
+        return {"UploadId": "u1"}
+
+    def upload_part_copy(self, Bucket, Key, UploadId, PartNumber, CopySource, CopySourceRange):
+        with self.lock:
+            if PartNumber == 2 and PartNumber not in self.uploads["failed_once"]:
+                self.uploads["failed_once"].add(PartNumber)
+                raise ConnectionError("reset")
+            self.uploads["parts"].append((PartNumber, CopySourceRange))
+        return {"CopyPartResult": {"ETag": f'"p{PartNumber}"'}}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = MultipartUpload["Parts"]
+        size = self.buckets["src"][Key][1]
+        self.buckets.setdefault(Bucket, {})[Key] = (f"mp-{len(parts)}", size, self.uploads["metadata"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted = Key
+
+
+class TestMinioSync(unittest.TestCase):
+    def test_sync_bucket_pages_through_listing_and_skips_unchanged(self):
+        from backend.app.services.sync_service import _sync_bucket_objects
+
+        src = {f"k{i:02d}": (f"e{i}", i) for i in range(7)}
+        tgt = {"k00": ("e0", 0), "k03": ("stale", 3), "k05": ("e5", 5)}
+        s3 = FakeS3({"src": src, "tgt": tgt})
+
+        self.assertEqual(_sync_bucket_objects(s3, "src", "tgt", parallelism=3), (5, 2))
+        self.assertEqual(sorted(s3.copies), ["k01", "k02", "k03", "k04", "k06"])
+        self.assertEqual(s3.buckets["tgt"], src)
+
+    def test_listing_verification_heads_only_multipart_mismatches(self):
+        from backend.app.services.sync_service import _verify_bucket_listings
+
+        src = {"a": ("e1", 1), "b": ("e2", 2), "c": ("e3", 3), "d": ("e4", 4)}
+        tgt = {"a": ("e1", 1), "b": ("mp-2", 2, {"source-etag": "e2"}), "c": ("bad", 3)}
+        s3 = FakeS3({"src": src, "tgt": tgt})
+        heads = []
+        head_object = s3.head_object
+        s3.head_object = lambda Bucket, Key: heads.append(Key) or head_object(Bucket, Key)
+
+        failures = _verify_bucket_listings(s3, "src", "tgt")
+
+        self.assertEqual([k for k, _ in failures], ["c", "d"])
+        self.assertIn("missing", failures[1][1])
+        self.assertEqual(heads, ["b"])
+
+    def test_large_object_is_copied_in_parts_and_retried_per_part(self):
+        from unittest import mock
+        from backend.app.services.sync_service import _sync_bucket_objects
+
+        mib = 1024 * 1024
+        s3 = FakeS3({"src": {"big": ("e1", 12 * mib)}, "tgt": {}})
+        multipart = {"threshold": 8 * mib, "part_size": 5 * mib, "part_parallelism": 2}
+
+        with mock.patch("backend.app.services.sync_service.time.sleep"):
+            self.assertEqual(_sync_bucket_objects(s3, "src", "tgt", 2, multipart=multipart), (1, 0))
+        self.assertEqual(sorted(s3.uploads["parts"]), [
+            (1, f"bytes=0-{5 * mib - 1}"),
+            (2, f"bytes={5 * mib}-{10 * mib - 1}"),
+            (3, f"bytes={10 * mib}-{12 * mib - 1}"),
+        ])
+        self.assertEqual(s3.buckets["tgt"]["big"][2]["source-etag"], "e1")
+
+        # A re-sync recognises the multipart copy through its source-etag metadata
+        self.assertEqual(_sync_bucket_objects(s3, "src", "tgt", 2, multipart=multipart), (0, 1))
+
+
+class TestSyncWriters(unittest.TestCase):
+    def setUp(self):
+        from sqlalchemy import create_engine
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'target.db')}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_executemany_writer_replaces_and_keeps_nulls(self):
+        import pandas as pd
+        from backend.app.services.sync_writers import ExecuteManyWriter, create_writer
+
+        pd.DataFrame({"a": [9]}).to_sql("t", self.engine, index=False)
+
+        writer = create_writer(self.engine, "t", "overwrite", {"batch_size": 2, "commit_every": 2})
+        self.assertIsInstance(writer, ExecuteManyWriter)
+        with writer:
+            writer.write(pd.DataFrame({"a": [1, 2, 3], "b": ["x", None, "z"]}))
+            writer.write(pd.DataFrame({"a": [4], "b": [float("nan")]}))
+
+        df = pd.read_sql("SELECT * FROM t ORDER BY a", self.engine)
+        self.assertEqual(df["a"].tolist(), [1, 2, 3, 4])
+        self.assertEqual(df["b"].isna().tolist(), [False, True, False, True])
+        self.assertEqual(writer.rows_written, 4)
+
+    def test_load_data_writer_loads_binary_columns_as_hex(self):
+        import pandas as pd
+        from sqlalchemy import create_engine
+        from backend.app.services.sync_writers import LoadDataWriter
+
+        statements = []
+
+        class Conn:
+            def exec_driver_sql(self, sql):
+                infile = sql.split("'")[1]
+                with open(infile, encoding="utf-8") as f:
+                    statements.append((sql, f.read()))
+
+        mysql = create_engine("mysql+pymysql://u:p@localhost/db")
+        writer = LoadDataWriter(mysql, "blobs")
+        writer._conn = Conn()
+        writer._write_rows(pd.DataFrame({"id": [1, 2], "data": [b"\x00\xffab", None], "name": ["a\\b", "c"]}))
+
+        sql, csv_text = statements[0]
+        self.assertTrue(sql.endswith("(id, @b1, name) SET data = UNHEX(@b1)"))
+        self.assertEqual(csv_text, "1,00ff6162,a\\\\b\n2,\\N,c\n")
+
+    def test_mysql_table_ddl_keeps_types_and_indexes_without_foreign_keys(self):
+        from types import SimpleNamespace
+        from backend.app.services.sync_writers import mysql_table_ddl
+
+        source_ddl = (
+            "CREATE TABLE `orders` (\n"
+            "  `id` bigint unsigned NOT NULL AUTO_INCREMENT,\n"
+            "  `user_id` int NOT NULL,\n"
+            "  `total` decimal(12,2) DEFAULT NULL,\n"
+            "  `total_cents` bigint GENERATED ALWAYS AS ((`total` * 100)) STORED,\n"
+            "  PRIMARY KEY (`id`),\n"
+            "  KEY `idx_user` (`user_id`),\n"
+            "  CONSTRAINT `fk_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`),\n"
+            "  CONSTRAINT `orders_chk_1` CHECK ((`total` >= 0)),\n"
+            "  CONSTRAINT `positive user` CHECK ((`user_id` > 0)) /*!80016 NOT ENFORCED */\n"
+            ") ENGINE=InnoDB AUTO_INCREMENT=42 DEFAULT CHARSET=utf8mb4"
+        )
+
+        class Conn:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query):
+                return SimpleNamespace(one=lambda: ("orders", source_ddl))
+
+        engine = SimpleNamespace(dialect=SimpleNamespace(name="mysql"), connect=Conn)
+        self.assertEqual(mysql_table_ddl(engine, "orders", "orders_copy"), (
+            "CREATE TABLE IF NOT EXISTS `orders_copy` (\n"
+            "  `id` bigint unsigned NOT NULL AUTO_INCREMENT,\n"
+            "  `user_id` int NOT NULL,\n"
+            "  `total` decimal(12,2) DEFAULT NULL,\n"
+            "  `total_cents` bigint,\n"
+            "  PRIMARY KEY (`id`),\n"
+            "  KEY `idx_user` (`user_id`),\n"
+            "  CHECK ((`total` >= 0)),\n"
+            "  CHECK ((`user_id` > 0)) /*!80016 NOT ENFORCED */\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"
+        ))
+        self.assertIsNone(mysql_table_ddl(self.engine, "orders", "orders_copy"))
+
+    def test_merge_writer_adds_unique_key_to_existing_target(self):
+        import pandas as pd
+        from backend.app.services.sync_writers import create_writer
+
+        # Left by an earlier append run: no key on the merge column
+        pd.DataFrame({"id": [1, 2], "v": ["a", "b"]}).to_sql("t", self.engine, index=False)
+        with create_writer(self.engine, "t", "merge", {}, key=["id"]) as writer:
+            writer.write(pd.DataFrame({"id": [2, 3], "v": ["B", "c"]}))
+        df = pd.read_sql("SELECT * FROM t ORDER BY id", self.engine)
+        self.assertEqual(df.values.tolist(), [[1, "a"], [2, "B"], [3, "c"]])
+
+        # Duplicates already in the target make the key impossible, which fails the write
+        pd.DataFrame({"id": [1, 1], "v": ["a", "b"]}).to_sql("dup", self.engine, index=False)
+        with self.assertRaisesRegex(Exception, "no unique key"):
+            with create_writer(self.engine, "dup", "merge", {}, key=["id"]) as writer:
+                writer.write(pd.DataFrame({"id": [1], "v": ["c"]}))
+
+    def test_mysql_table_ddl_keeps_partition_block(self):
+        from types import SimpleNamespace
+        from backend.app.services.sync_writers import mysql_table_ddl
+
+        source_ddl = (
+            "CREATE TABLE `events` (\n"
+            "  `id` bigint NOT NULL AUTO_INCREMENT,\n"
+            "  `ts` int NOT NULL,\n"
+            "  PRIMARY KEY (`id`,`ts`)\n"
+            ") ENGINE=InnoDB AUTO_INCREMENT=7 DEFAULT CHARSET=utf8mb4\n"
+            "/*!50100 PARTITION BY RANGE (`ts`)\n"
+            "(PARTITION p0 VALUES LESS THAN (100) ENGINE = InnoDB,\n"
+            " PARTITION p1 VALUES LESS THAN MAXVALUE ENGINE = InnoDB) */"
+        )
+
+        class Conn:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query):
+                return SimpleNamespace(one=lambda: ("events", source_ddl))
+
+        engine = SimpleNamespace(dialect=SimpleNamespace(name="mysql"), connect=Conn)
+        self.assertEqual(mysql_table_ddl(engine, "events", "events_copy"), (
+            "CREATE TABLE IF NOT EXISTS `events_copy` (\n"
+            "  `id` bigint NOT NULL AUTO_INCREMENT,\n"
+            "  `ts` int NOT NULL,\n"
+            "  PRIMARY KEY (`id`,`ts`)\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4\n"
+            "/*!50100 PARTITION BY RANGE (`ts`)\n"
+            "(PARTITION p0 VALUES LESS THAN (100) ENGINE = InnoDB,\n"
+            " PARTITION p1 VALUES LESS THAN MAXVALUE ENGINE = InnoDB) */"
+        ))
+
+    def test_writer_rolls_back_uncommitted_chunks_on_error(self):
+        import pandas as pd
+        from backend.app.services.sync_writers import create_writer
+
+        with self.assertRaises(RuntimeError):
+            with create_writer(self.engine, "t", "append", {"commit_every": 10}) as writer:
+                writer.write(pd.DataFrame({"a": [1, 2]}))
+                raise RuntimeError("boom")
+
+        df = pd.read_sql("SELECT * FROM t", self.engine)
+        self.assertEqual(len(df), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
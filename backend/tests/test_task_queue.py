@@ -0,0 +1,203 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+
+class TestTaskQueue(unittest.TestCase):
+    """Queue operations against a SQLite file standing in for the system DB."""
+
+    def setUp(self):
+        from types import SimpleNamespace
+        from sqlmodel import SQLModel, create_engine
+        import backend.app.services.task_queue as task_queue
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'meta.db')}")
+        SQLModel.metadata.create_all(self.engine)
+
+        self.task_queue = task_queue
+        self._orig = (task_queue.engine, task_queue.settings)
+        task_queue.engine = self.engine
+        task_queue.settings = SimpleNamespace(
+            WORKER_TASKS_PER_SOURCE=1, WORKER_STALE_SECONDS=60, WORKER_MAX_ATTEMPTS=2,
+            WORKER_HEARTBEAT_SECONDS=0.01, WORKER_POLL_SECONDS=0.01, WORKER_PROCESSES=4,
+            SCHEDULER_WEIGHTS={"sync": 1, "preprocess": 3}, SCHEDULER_AGING_SECONDS=600,
+            SCHEDULER_SMALL_TASK_ROWS=1000, SCHEDULER_DEFAULT_SYNC_ROWS=100000,
+            SCHEDULER_MAX_RUNNING_ROWS=250000, SCHEDULER_MAX_BULK_TASKS=0,
+        )
+
+    def tearDown(self):
+        self.task_queue.engine, self.task_queue.settings = self._orig
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def _datasource(self, **conn_info):
+        from sqlmodel import Session
+        from backend.app.models.datasource import DataSource
+
+        with Session(self.engine) as session:
+            ds = DataSource(name="src", type="mysql", connection_info=json.dumps(conn_info))
+            session.add(ds)
+            session.commit()
+            return ds.id
+
+    def _queue(self, name, source_id):
+        from sqlmodel import Session
+        from backend.app.models.task import DataTask
+
+        with Session(self.engine) as session:
+            task = DataTask(name=name, task_type="sync", config=json.dumps({"source_id": source_id}))
+            self.task_queue.enqueue_task(session, task)
+            session.commit()
+            return task.id
+
+    def _task(self, task_id):
+        from sqlmodel import Session
+        from backend.app.models.task import DataTask
+
+        with Session(self.engine) as session:
+            return session.get(DataTask, task_id)
+
+    def test_claim_is_fifo_and_respects_per_source_caps(self):
+        busy = self._datasource()
+        roomy = self._datasource(max_tasks=2)
+        first = self._queue("a", busy)
+        second = self._queue("b", busy)
+        third = self._queue("c", roomy)
+
+        self.assertEqual(self.task_queue.claim_task("w1"), first)
+        # The busy source is at its cap of 1, so the next claim skips to the other source
+        self.assertEqual(self.task_queue.claim_task("w2"), third)
+        self.assertIsNone(self.task_queue.claim_task("w3"))
+
+        claimed = self._task(first)
+        self.assertEqual((claimed.status, claimed.worker_id, claimed.attempts), ("running", "w1", 1))
+        self.assertEqual(self._task(second).status, "queued")
+
+    def test_schedule_order_shares_workers_by_weight_and_priority(self):
+        from backend.app.models.task import DataTask
+
+        now = datetime.utcnow()
+
+        def task(id, task_type, priority=0, age=0):
+            return DataTask(id=id, name=str(id), task_type=task_type, config="{}", priority=priority,
+                            queued_at=now - timedelta(seconds=age))
+
+        queued = [task(1, "sync", age=30), task(2, "sync", priority=5), task(3, "preprocess", age=20),
+                  task(4, "preprocess", age=10), task(5, "preprocess"), task(6, "preprocess")]
+        order = self.task_queue.schedule_order(queued, [], now)
+        # Three preprocess picks per sync; higher priority first within a class, then FIFO
+        self.assertEqual([t.id for t in order], [3, 4, 2, 5, 6, 1])
+
+        # With a sync already running, preprocess tasks take the next four picks
+        running = [task(7, "sync")]
+        self.assertEqual([t.id for t in self.task_queue.schedule_order(queued, running, now)], [3, 4, 5, 6, 2, 1])
+
+        # Aging: an hour of waiting outranks priority 5
+        queued = [task(1, "sync", age=3600), task(2, "sync", priority=5)]
+        self.assertEqual([t.id for t in self.task_queue.schedule_order(queued, [], now)], [1, 2])
+
+    def test_bulk_tasks_wait_for_capacity_while_interactive_tasks_start(self):
+        from sqlmodel import Session
+        from backend.app.models.task import DataTask
+
+        source_id = self._datasource(max_tasks=10)
+        bulk = [self._queue(f"bulk{i}", source_id) for i in range(4)]
+        small = self._queue("preview", source_id)
+        with Session(self.engine) as session:
+            preview = session.get(DataTask, small)
+            preview.task_type = "preprocess"
+            session.add(preview)
+            for i, task_id in enumerate(bulk):
+                task = session.get(DataTask, task_id)
+                task.estimated_rows = 200000 if i == 0 else 20000
+                session.add(task)
+            session.commit()
+
+        claimed = [self.task_queue.claim_task(f"w{i}") for i in range(5)]
+        # The preview job goes first; the 200k-row sync is admitted alone, and later syncs
+        # only while the running estimate fits in 250k rows
+        self.assertEqual(claimed, [small, bulk[0], bulk[1], bulk[2], None])
+        self.assertEqual(self._task(bulk[3]).status, "queued")
+
+    def test_stale_tasks_are_requeued_then_failed(self):
+        from sqlmodel import Session
+        from backend.app.models.task import DataTask
+
+        task_id = self._queue("a", self._datasource())
+
+        def claim_and_stall():
+            self.assertEqual(self.task_queue.claim_task("w1"), task_id)
+            with Session(self.engine) as session:
+                task = session.get(DataTask, task_id)
+                task.heartbeat_at = datetime.utcnow() - timedelta(seconds=120)
+                session.add(task)
+                session.commit()
+            return self.task_queue.requeue_stale_tasks()
+
+        self.assertEqual(claim_and_stall(), 1)
+        self.assertEqual(self._task(task_id).status, "queued")
+        self.assertEqual(claim_and_stall(), 1)
+        self.assertEqual(self._task(task_id).status, "failed")
+
+    def test_worker_runs_claimed_task_and_heartbeats(self):
+        import backend.app.worker as worker
+
+        task_id = self._queue("a", self._datasource())
+        stop = threading.Event()
+        seen = []
+
+        def run_task(claimed_id):
+            before = self._task(claimed_id).heartbeat_at
+            threading.Event().wait(0.1)
+            seen.append((claimed_id, self._task(claimed_id).heartbeat_at > before))
+            stop.set()
+
+        orig = worker.settings
+        worker.settings = self.task_queue.settings
+        try:
+            worker.run_worker("w1", stop, run_task=run_task)
+        finally:
+            worker.settings = orig
+        self.assertEqual(seen, [(task_id, True)])
+
+    def test_worker_stops_task_it_lost_to_a_requeue(self):
+        import backend.app.worker as worker
+        from sqlmodel import Session
+        from backend.app.models.task import DataTask
+
+        task_id = self._queue("a", self._datasource())
+        stop = threading.Event()
+        seen = []
+
+        def run_task(claimed_id):
+            # A DB blip outlasted WORKER_STALE_SECONDS: another worker requeued and claimed the task
+            with Session(self.engine) as session:
+                task = session.get(DataTask, claimed_id)
+                task.worker_id = "w2"
+                session.add(task)
+                session.commit()
+            with Session(self.engine) as session:
+                seen.append(self.task_queue.lease_lost(claimed_id, session))
+            with self.assertRaises(self.task_queue.TaskLost):
+                self.task_queue.check_lease(claimed_id)
+            stop.set()
+
+        orig = worker.settings
+        worker.settings = self.task_queue.settings
+        try:
+            worker.run_worker("w1", stop, run_task=run_task)
+        finally:
+            worker.settings = orig
+        self.assertEqual(seen, [True])
+        self.assertFalse(self.task_queue.heartbeat(task_id, "w1"))
+        self.assertTrue(self.task_queue.heartbeat(task_id, "w2"))
+        # Outside a worker there is no lease to lose
+        self.assertFalse(self.task_queue.lease_lost(task_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
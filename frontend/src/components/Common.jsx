@@ -21,6 +21,7 @@ export const Modal = ({ isOpen, onClose, title, children }) => {
 export const StatusBadge = ({ status }) => {
   const styles = {
     pending: "bg-slate-100 text-slate-600 border-slate-300",
+    queued: "bg-amber-50 text-amber-600 border-amber-200",
     running: "bg-blue-50 text-blue-600 border-blue-200 animate-pulse",
     success: "bg-emerald-50 text-emerald-600 border-emerald-200",
     failed: "bg-rose-50 text-rose-600 border-rose-200",
@@ -28,6 +29,7 @@ export const StatusBadge = ({ status }) => {
   
   const icons = {
     pending: <Clock size={14} strokeWidth={2.5} />,
+    queued: <Clock size={14} strokeWidth={2.5} />,
     running: <RefreshCw size={14} className="animate-spin" strokeWidth={2.5} />,
     success: <CheckCircle size={14} strokeWidth={2.5} />,
     failed: <XCircle size={14} strokeWidth={2.5} />,
@@ -391,7 +391,7 @@ const TasksPage = () => {
                     </button>
                     <button 
                         onClick={() => handleRun(task.id)}
-                        disabled={task.status === 'running'}
+                        disabled={task.status === 'running' || task.status === 'queued'}
                         className="text-emerald-500 hover:text-emerald-600 disabled:opacity-50 disabled:cursor-not-allowed p-2 rounded hover:bg-emerald-50 transition-colors"
                         title="运行任务"
                     >